@@ -0,0 +1,192 @@
+"""Bulk-load users from a CSV or JSON Lines file.
+
+Each record needs username and email plus either password (hashed here,
+in parallel across cores) or password_hash (stored as is); is_active is
+optional. Records are loaded in chunks: COPY into a temporary staging
+table, then one set-based INSERT that skips usernames/emails that already
+exist or repeat within the chunk. Skipped records are reported, not fatal.
+
+Usage: python import_users.py users.csv [--chunk-size 50000] [--report duplicates.csv]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db, password_hasher
+
+STAGING_DDL = """
+CREATE TEMP TABLE user_import_staging (
+    line_no BIGINT NOT NULL,
+    username VARCHAR(80) NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    is_active BOOLEAN NOT NULL
+) ON COMMIT DROP
+"""
+
+MERGE_SQL = """
+WITH candidates AS (
+    SELECT s.*,
+           row_number() OVER (PARTITION BY s.username ORDER BY s.line_no) AS username_rank,
+           row_number() OVER (PARTITION BY s.email ORDER BY s.line_no) AS email_rank
+    FROM user_import_staging s
+), accepted AS (
+    SELECT c.*
+    FROM candidates c
+    WHERE c.username_rank = 1
+      AND c.email_rank = 1
+      AND NOT EXISTS (SELECT 1 FROM users u WHERE u.username = c.username)
+      AND NOT EXISTS (SELECT 1 FROM users u WHERE u.email = c.email)
+), inserted AS (
+    INSERT INTO users (username, email, password_hash, is_active, created_at)
+    SELECT username, email, password_hash, is_active, now()
+    FROM accepted
+    ORDER BY line_no
+    ON CONFLICT DO NOTHING
+    RETURNING username
+)
+SELECT s.line_no, s.username, s.email
+FROM user_import_staging s
+WHERE s.line_no NOT IN (
+    SELECT a.line_no FROM accepted a JOIN inserted i ON i.username = a.username
+)
+ORDER BY s.line_no
+"""
+
+
+def read_records(path):
+    """Yield (line_no, record dict) from a .csv or .jsonl file"""
+    with open(path, newline='') as handle:
+        if path.endswith('.jsonl') or path.endswith('.ndjson'):
+            for line_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+        else:
+            # Line 1 is the header
+            for line_no, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_no, row
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'f', 'n')
+
+
+def prepare_chunk(chunk, pool, method):
+    """Split a chunk into staged rows and invalid records, hashing plain passwords in parallel"""
+    rows = []
+    invalid = []
+    to_hash = []
+
+    for line_no, record in chunk:
+        username = (record.get('username') or '').strip()
+        email = (record.get('email') or '').strip()
+        password = record.get('password')
+        password_hash = record.get('password_hash')
+        if not username or not email or not (password or password_hash):
+            invalid.append((line_no, username, email, 'missing username, email or password'))
+            continue
+        if not 3 <= len(username) <= 80 or len(email) > 120 or (password_hash and len(password_hash) > 255):
+            invalid.append((line_no, username, email, 'field too long or too short'))
+            continue
+
+        row = [line_no, username, email, password_hash, parse_bool(record.get('is_active', True))]
+        rows.append(row)
+        if not password_hash:
+            to_hash.append((row, password))
+
+    hashes = pool.map(generate_password_hash, [password for _, password in to_hash], repeat(method), chunksize=64)
+    for (row, _), hashed in zip(to_hash, hashes):
+        row[3] = hashed
+
+    return rows, invalid
+
+
+def load_chunk(rows):
+    """COPY rows into staging and merge them; return the rows that were skipped"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line_no, username, email, password_hash, is_active in rows:
+        writer.writerow([line_no, username, email, password_hash, 't' if is_active else 'f'])
+    buffer.seek(0)
+
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(STAGING_DDL)
+        cursor.copy_expert(
+            'COPY user_import_staging (line_no, username, email, password_hash, is_active) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(MERGE_SQL)
+        skipped = cursor.fetchall()
+        connection.commit()
+        return skipped
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def import_users(path, chunk_size=50000, workers=None, report=None):
+    records = read_records(path)
+    totals = {'inserted': 0, 'duplicates': 0, 'invalid': 0}
+    report_writer = csv.writer(report) if report else None
+    if report_writer:
+        report_writer.writerow(['line_no', 'username', 'email', 'reason'])
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            started = time.perf_counter()
+            rows, invalid = prepare_chunk(chunk, pool, password_hasher.method)
+            skipped = load_chunk(rows) if rows else []
+
+            totals['invalid'] += len(invalid)
+            totals['duplicates'] += len(skipped)
+            totals['inserted'] += len(rows) - len(skipped)
+            if report_writer:
+                report_writer.writerows(invalid)
+                report_writer.writerows((line_no, username, email, 'duplicate') for line_no, username, email in skipped)
+
+            print(f"Loaded {len(chunk)} records in {time.perf_counter() - started:.1f}s "
+                  f"(inserted {totals['inserted']}, duplicates {totals['duplicates']}, invalid {totals['invalid']})",
+                  file=sys.stderr)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import users')
+    parser.add_argument('path', help='CSV (with header) or JSON Lines file')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=None, help='Hashing processes (default: all cores)')
+    parser.add_argument('--report', help='Write skipped records to this CSV file')
+    args = parser.parse_args()
+
+    report = open(args.report, 'w', newline='') if args.report else None
+    try:
+        with create_app().app_context():
+            totals = import_users(args.path, args.chunk_size, args.workers, report)
+    finally:
+        if report:
+            report.close()
+
+    print(json.dumps(totals))
+
+
+if __name__ == '__main__':
+    main()
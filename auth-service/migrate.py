@@ -0,0 +1,61 @@
+"""Apply auth-service schema migrations.
+
+Run once per deploy, before new app versions take traffic; the services
+themselves never create or alter tables. Migrations are append-only:
+add a new version for every schema change and raise
+REQUIRED_SCHEMA_VERSION in app.py once the code depends on it.
+
+Usage: python migrate.py [--status]
+"""
+import argparse
+import logging
+
+from app import create_app, db, REQUIRED_SCHEMA_VERSION
+from schema_migrations import MigrationRunner
+
+logging.basicConfig(level=logging.INFO)
+
+# Version 1 is the schema db.metadata.create_all() produced when migrations
+# were introduced, frozen here so later model edits cannot change it. IF NOT
+# EXISTS keeps it a no-op on databases whose tables predate migrations.
+MIGRATIONS = [
+    (1, 'baseline schema', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL NOT NULL,
+            username VARCHAR(80) NOT NULL,
+            email VARCHAR(120) NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            is_active BOOLEAN,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id),
+            UNIQUE (username),
+            UNIQUE (email)
+        )
+        """
+    ]),
+    (2, 'user roles', [
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR(20) NOT NULL DEFAULT 'customer'"
+    ])
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply auth-service schema migrations')
+    parser.add_argument('--status', action='store_true', help='show the schema version and exit')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        runner = MigrationRunner(db.engine, MIGRATIONS)
+        if runner.latest < REQUIRED_SCHEMA_VERSION:
+            raise SystemExit(f"app.py requires schema {REQUIRED_SCHEMA_VERSION} but the newest migration is {runner.latest}")
+        if args.status:
+            print(f"Schema version {runner.current()} (latest {runner.latest}, required {REQUIRED_SCHEMA_VERSION})")
+            return
+        applied = runner.run()
+
+    print(f"Applied migrations {applied}" if applied else 'Schema is up to date')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# werkzeug's scrypt parameters when the method string leaves them out
+DEFAULT_SCRYPT_PARAMETERS = (2 ** 15, 8, 1)
+
+
+class HasherOverloaded(Exception):
+    """Raised when too many hash jobs are already queued, or one waited past the timeout"""
+
+
+def parse_method(method):
+    """(algorithm, parameters) of a werkzeug hash method, with werkzeug's defaults filled in.
+
+    'pbkdf2', 'pbkdf2:sha256' and 'pbkdf2:sha256:600000' all describe the
+    same hashes when 600000 is werkzeug's default, so they parse the same.
+    """
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        digest = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return name, (digest, iterations)
+    if name == 'scrypt':
+        given = tuple(int(arg) for arg in args)
+        return name, given + DEFAULT_SCRYPT_PARAMETERS[len(given):]
+    return name, tuple(args)
+
+
+class PasswordHasher:
+    """Runs PBKDF2 hashing and verification in a bounded process pool.
+
+    Request threads only wait on a future, so CPU-heavy hashing no longer
+    pins a web worker. Once max_pending jobs are in flight, new jobs fail
+    fast with HasherOverloaded instead of queueing without limit. A job's
+    slot is freed when the job finishes, not when its caller stops
+    waiting, so callers that time out cannot let the queue grow past
+    max_pending either.
+    """
+
+    def __init__(self, method, max_workers=None, max_pending=None, timeout=10):
+        self.method = method
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'hash': {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0},
+            'verify': {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0},
+            'rejected': 0,
+            'timeouts': 0
+        }
+
+    def hash(self, password):
+        return self._run('hash', generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run('verify', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with different parameters than configured"""
+        method = password_hash.split('$', 1)[0]
+        try:
+            return parse_method(method) != parse_method(self.method)
+        except ValueError:
+            return True
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                kind: dict(values, avg_ms=round(values['total_ms'] / values['count'], 2) if values['count'] else 0.0)
+                for kind, values in self._stats.items() if kind in ('hash', 'verify')
+            }
+            stats['rejected'] = self._stats['rejected']
+            stats['timeouts'] = self._stats['timeouts']
+        stats['max_pending'] = self.max_pending
+        stats['workers'] = self.max_workers
+        return stats
+
+    def _pool(self):
+        # Pools do not survive fork, so each server worker process builds its own
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, kind, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HasherOverloaded()
+
+        started = time.perf_counter()
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Drop it if it has not started; either way its slot frees once it is done
+            future.cancel()
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise HasherOverloaded()
+        finally:
+            self._record(kind, (time.perf_counter() - started) * 1000)
+
+    def _record(self, kind, elapsed_ms):
+        with self._lock:
+            stats = self._stats[kind]
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
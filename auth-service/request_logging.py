@@ -0,0 +1,64 @@
+# Generated from shared/request_logging.py by scripts/sync_shared.py; edit that file, not this copy.
+import json
+import logging
+import os
+import random
+import time
+
+from flask import g, request
+
+logger = logging.getLogger('request')
+
+
+class RequestLogger:
+    """Structured, sampled request logging.
+
+    One JSON line per logged request. Server errors and requests slower
+    than slow_ms are always logged; the rest at sample_rate, so the log
+    stays cheap at production request rates.
+    """
+
+    def __init__(self, app=None, service=None, sample_rate=0.01, slow_ms=1000):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.service = self.service or app.import_name
+        # Lines are JSON documents on their own, without the root logger's prefix
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        app.before_request(self._start)
+        app.after_request(self._log)
+
+    def _start(self):
+        g._request_started = time.perf_counter()
+
+    def _log(self, response):
+        started = g.get('_request_started')
+        if started is None:
+            return response
+        duration_ms = (time.perf_counter() - started) * 1000
+        slow = duration_ms >= self.slow_ms
+        error = response.status_code >= 500
+        if not (slow or error or random.random() < self.sample_rate):
+            return response
+
+        logger.info(json.dumps({
+            'ts': round(time.time(), 3),
+            'service': self.service,
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'sampled': not (slow or error),
+            'pid': os.getpid()
+        }))
+        return response
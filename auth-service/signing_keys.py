@@ -0,0 +1,194 @@
+"""RSA signing keys for access tokens.
+
+Keys are PEM files in JWT_KEYS_DIR named <kid>.pem. The key whose kid sorts
+last signs new tokens; every key in the directory stays in the published
+JWKS so tokens signed before a rotation keep verifying until they expire.
+
+Create the first key before the workers start with
+python signing_keys.py ensure; rotate with
+python signing_keys.py rotate [--max-token-age-days 30]
+"""
+import argparse
+import fcntl
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+
+def generate_key(keys_dir):
+    """Write a new 2048-bit RSA key and return its kid.
+
+    The kid is the creation time to the microsecond, so the newest key
+    sorts last, plus a random suffix, so keys never share a name. The
+    key is written to a temporary file and linked into place, which never
+    replaces an existing key and never exposes a partly written one.
+    """
+    os.makedirs(keys_dir, exist_ok=True)
+    kid = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S.%fZ}-{secrets.token_hex(4)}"
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = os.path.join(keys_dir, f"{kid}.pem")
+    temp_path = os.path.join(keys_dir, f".{kid}.tmp")
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
+        os.link(temp_path, path)
+    finally:
+        os.remove(temp_path)
+    return kid
+
+
+def ensure_key(keys_dir):
+    """Generate a key unless the directory already holds one; returns the new kid or None.
+
+    Holds an exclusive lock on the directory's .lock file while checking,
+    so processes starting together (gunicorn workers, replicas sharing the
+    volume) create one key between them rather than one each.
+    """
+    os.makedirs(keys_dir, exist_ok=True)
+    with open(os.path.join(keys_dir, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if any(name.endswith('.pem') for name in os.listdir(keys_dir)):
+            return None
+        return generate_key(keys_dir)
+
+
+def key_created_at(kid, path):
+    """Creation time of a key, from its kid or else its file"""
+    stamp = kid.split('-', 1)[0]
+    for kid_format in ('%Y%m%dT%H%M%S.%fZ', '%Y%m%dT%H%M%SZ'):
+        try:
+            return datetime.strptime(stamp, kid_format).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def retired_keys(keys_dir, max_token_age, now=None):
+    """Kids of keys no unexpired token can have been signed with.
+
+    A key signs tokens until the next one is created, and no token lives
+    longer than max_token_age seconds, so a key can go once its successor
+    is older than that. Refresh tokens share the keys and outlive access
+    tokens, so max_token_age is the refresh token lifetime. The newest key
+    is never retired.
+    """
+    now = time.time() if now is None else now
+    keys = sorted(
+        (name[:-len('.pem')], os.path.join(keys_dir, name))
+        for name in os.listdir(keys_dir)
+        if name.endswith('.pem')
+    )
+    return [
+        kid for (kid, _), (successor, successor_path) in zip(keys, keys[1:])
+        if now - key_created_at(successor, successor_path) > max_token_age
+    ]
+
+
+class KeyRing:
+    """Loads signing keys from disk and serves the current key and the JWKS.
+
+    The directory is re-read at most every reload_interval seconds, so a
+    rotation (or removal of a retired key) reaches running workers without
+    a restart.
+    """
+
+    def __init__(self, keys_dir, reload_interval=60, generate_if_missing=True):
+        self.keys_dir = keys_dir
+        self.reload_interval = reload_interval
+        self.generate_if_missing = generate_if_missing
+        self._lock = threading.Lock()
+        self._state = None
+        self._loaded_at = 0.0
+
+    def current(self):
+        """(kid, private key PEM) used to sign new tokens"""
+        return self._load()['current']
+
+    def public_key(self, kid):
+        return self._load()['public_keys'].get(kid)
+
+    def jwks(self):
+        return self._load()['jwks']
+
+    def _load(self):
+        if self._state is not None and time.monotonic() - self._loaded_at < self.reload_interval:
+            return self._state
+
+        with self._lock:
+            if self._state is not None and time.monotonic() - self._loaded_at < self.reload_interval:
+                return self._state
+
+            paths = self._key_paths()
+            if not paths and self.generate_if_missing:
+                ensure_key(self.keys_dir)
+                paths = self._key_paths()
+            if not paths:
+                raise RuntimeError(f"No signing keys found in {self.keys_dir}")
+
+            public_keys = {}
+            jwks = []
+            current = None
+            for kid, path in paths:
+                with open(path, 'rb') as handle:
+                    pem = handle.read()
+                public_key = serialization.load_pem_private_key(pem, password=None).public_key()
+                public_keys[kid] = public_key.public_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PublicFormat.SubjectPublicKeyInfo
+                )
+                jwk = json.loads(RSAAlgorithm.to_jwk(public_key))
+                jwk.update({'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+                jwks.append(jwk)
+                current = (kid, pem)
+
+            # Swap the whole state at once so readers never see a partial reload
+            self._state = {'current': current, 'public_keys': public_keys, 'jwks': {'keys': jwks}}
+            self._loaded_at = time.monotonic()
+            return self._state
+
+    def _key_paths(self):
+        if not os.path.isdir(self.keys_dir):
+            return []
+        return sorted(
+            (name[:-len('.pem')], os.path.join(self.keys_dir, name))
+            for name in os.listdir(self.keys_dir)
+            if name.endswith('.pem')
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage JWT signing keys')
+    parser.add_argument('command', choices=['ensure', 'rotate'])
+    parser.add_argument('--keys-dir', default=os.getenv('JWT_KEYS_DIR', 'keys'))
+    parser.add_argument('--max-token-age-days', type=float, default=float(os.getenv('REFRESH_TOKEN_DAYS', 30)),
+                        help='Longest token lifetime, i.e. the refresh token lifetime (REFRESH_TOKEN_DAYS); '
+                             'keys retired longer ago than this are removed')
+    args = parser.parse_args()
+
+    if args.command == 'ensure':
+        kid = ensure_key(args.keys_dir)
+        print(f"Generated signing key {kid}" if kid else 'A signing key already exists')
+        return
+
+    kid = generate_key(args.keys_dir)
+    print(f"Generated signing key {kid}")
+
+    for retired in retired_keys(args.keys_dir, args.max_token_age_days * 86400):
+        os.remove(os.path.join(args.keys_dir, f"{retired}.pem"))
+        print(f"Removed retired key {retired}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+"""Environment for the auth-service tests, set before any of them imports app.
+
+Signing keys are generated into a temporary directory rather than the
+service's keys/. With TEST_DATABASE_URL set, the app's database is that
+one with the users_batch_test schema first on the search path.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+TEST_SCHEMA = 'users_batch_test'
+
+os.environ['JWT_KEYS_DIR'] = tempfile.mkdtemp(prefix='auth-test-keys-')
+if TEST_DATABASE_URL:
+    separator = '&' if '?' in TEST_DATABASE_URL else '?'
+    os.environ['DATABASE_URL'] = f"{TEST_DATABASE_URL}{separator}options=-csearch_path%3D{TEST_SCHEMA}"
@@ -0,0 +1,102 @@
+"""Bloom filter and revocation checks, against an in-memory Redis."""
+import time
+
+from revocation import BloomFilter, RevocationList
+
+
+class FakeRedis:
+    """The sorted set, hash and counter commands RevocationList uses"""
+
+    def __init__(self):
+        self.strings = {}
+        self.zsets = {}
+        self.hashes = {}
+
+    def get(self, key):
+        return self.strings.get(key)
+
+    def incr(self, key):
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(member)
+
+    def zremrangebyscore(self, key, low, high):
+        entries = self.zsets.get(key, {})
+        for member in [member for member, score in entries.items() if score <= high]:
+            del entries[member]
+
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in self.zsets.get(key, {}).items() if score >= low]
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(10000, error_rate=0.001)
+    members = [f"jti:{i}" for i in range(10000)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    false_positives = sum(f"jti:other-{i}" in bloom for i in range(10000))
+    assert false_positives < 50
+
+
+def test_revoked_tokens_are_seen_by_other_processes():
+    redis = FakeRedis()
+    issuer, verifier = RevocationList(redis, sync_interval=3600), RevocationList(redis, sync_interval=3600)
+    assert not verifier.is_revoked({'jti': 'a', 'sub': '1'})
+
+    issuer.revoke_token('a', time.time() + 900)
+    verifier.sync()
+
+    assert verifier.is_revoked({'jti': 'a', 'sub': '1'})
+    assert not verifier.is_revoked({'jti': 'b', 'sub': '1'})
+
+
+def test_user_revocation_covers_tokens_issued_until_then():
+    redis = FakeRedis()
+    revocations = RevocationList(redis, sync_interval=3600)
+    revocations.sync()
+    now = int(time.time())
+
+    revocations.revoke_user(7, token_lifetime=900)
+
+    assert revocations.is_revoked({'jti': 'old', 'sub': '7', 'iat': now - 60})
+    assert not revocations.is_revoked({'jti': 'new', 'sub': '7', 'iat': now + 60})
+    assert not revocations.is_revoked({'jti': 'other', 'sub': '8', 'iat': now - 60})
+
+
+def test_sync_drops_entries_past_their_expiry():
+    redis = FakeRedis()
+    revocations = RevocationList(redis, sync_interval=3600)
+    revocations.revoke_token('expired', time.time() - 1)
+    revocations.revoke_token('live', time.time() + 900)
+
+    revocations.sync()
+
+    assert list(redis.zsets['auth:revoked']) == ['jti:live']
+    assert not revocations.is_revoked({'jti': 'expired'})
@@ -0,0 +1,44 @@
+"""POST /api/auth/service-token: API keys for short-lived service-role tokens."""
+import pytest
+from flask_jwt_extended import decode_token
+
+from app import create_app
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app()
+    app.config['SERVICE_API_KEYS'] = {'order-service': 'order-key'}
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_issues_a_service_role_token(app, client):
+    response = client.post('/api/auth/service-token', json={'service': 'order-service', 'api_key': 'order-key'})
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['expires_in'] == 300
+    with app.app_context():
+        claims = decode_token(body['token'])
+    assert claims['sub'] == 'service:order-service'
+    assert claims['role'] == 'service'
+    assert claims['exp'] - claims['iat'] == 300
+
+
+@pytest.mark.parametrize('payload', [
+    {'service': 'order-service', 'api_key': 'wrong'},
+    {'service': 'cart-service', 'api_key': 'order-key'},
+    {'service': 'order-service'},
+    {'service': ['order-service'], 'api_key': 'order-key'},
+    {}
+])
+def test_rejects_unknown_credentials(client, payload):
+    response = client.post('/api/auth/service-token', json=payload)
+
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Invalid service credentials'}
@@ -0,0 +1,45 @@
+"""Which signing keys rotation may remove."""
+import os
+from datetime import datetime, timezone
+
+from signing_keys import retired_keys
+
+DAY = 86400
+NOW = datetime(2024, 6, 30, tzinfo=timezone.utc).timestamp()
+
+
+def make_keys(tmp_path, *created):
+    kids = [f"{datetime.fromtimestamp(at, timezone.utc):%Y%m%dT%H%M%SZ}-0000000{i}" for i, at in enumerate(created)]
+    for kid in kids:
+        (tmp_path / f"{kid}.pem").write_text('')
+    return kids
+
+
+def test_keeps_keys_that_signed_unexpired_refresh_tokens(tmp_path):
+    # Weekly rotations: with 30-day refresh tokens no key may go yet,
+    # though a count-based --keep 3 would already have dropped two
+    make_keys(tmp_path, *(NOW - days * DAY for days in (28, 21, 14, 7, 0)))
+
+    assert retired_keys(tmp_path, 30 * DAY, now=NOW) == []
+
+
+def test_retires_a_key_once_its_successor_outlived_every_token(tmp_path):
+    kids = make_keys(tmp_path, NOW - 70 * DAY, NOW - 40 * DAY, NOW - 20 * DAY, NOW)
+
+    # The first key stopped signing 40 days ago; the second only 20 days ago
+    assert retired_keys(tmp_path, 30 * DAY, now=NOW) == kids[:1]
+
+
+def test_never_retires_the_newest_key(tmp_path):
+    make_keys(tmp_path, NOW - 400 * DAY)
+
+    assert retired_keys(tmp_path, 30 * DAY, now=NOW) == []
+
+
+def test_falls_back_to_file_time_for_other_kid_formats(tmp_path):
+    for kid, at in (('legacy-a', NOW - 90 * DAY), ('legacy-b', NOW - 60 * DAY), ('legacy-c', NOW - DAY)):
+        path = tmp_path / f"{kid}.pem"
+        path.write_text('')
+        os.utime(path, (at, at))
+
+    assert retired_keys(tmp_path, 30 * DAY, now=NOW) == ['legacy-a']
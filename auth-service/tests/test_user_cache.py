@@ -0,0 +1,86 @@
+"""UserCache's shared tier and invalidation tombstones, against an in-memory Redis."""
+import os
+
+import pytest
+
+from user_cache import UserCache
+
+
+class FakeRedis:
+    """The string and pipeline commands UserCache uses; expiry is driven by expire_all()"""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def expire_all(self):
+        self.data.clear()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+def make_cache(redis):
+    cache = UserCache(ttl=30, redis_client=redis)
+    # No invalidation listener thread; these tests call invalidate() directly
+    cache._subscriber_pid = os.getpid()
+    return cache
+
+
+def test_replicas_share_filled_users(redis):
+    first, second = make_cache(redis), make_cache(redis)
+
+    assert first.get(1, lambda: {'id': 1, 'role': 'customer'}) == {'id': 1, 'role': 'customer'}
+    assert second.get(1, lambda: pytest.fail('loaded twice')) == {'id': 1, 'role': 'customer'}
+    assert second.stats()['shared_hits'] == 1
+
+
+def test_fill_read_before_an_invalidation_is_rejected(redis):
+    stale_reader, writer = make_cache(redis), make_cache(redis)
+
+    def slow_loader():
+        # The reader has the old row; meanwhile another replica commits a role change
+        writer.invalidate(1)
+        return {'id': 1, 'role': 'customer'}
+
+    assert stale_reader.get(1, slow_loader) == {'id': 1, 'role': 'customer'}
+
+    # Neither tier kept the old row
+    assert stale_reader.get(1, lambda: {'id': 1, 'role': 'admin'}) == {'id': 1, 'role': 'admin'}
+    assert stale_reader.get(1, lambda: pytest.fail('not cached locally')) == {'id': 1, 'role': 'admin'}
+    assert make_cache(redis).get(1, lambda: {'id': 1, 'role': 'admin'}) == {'id': 1, 'role': 'admin'}
+    assert redis.published == [('auth:user-invalidate', 1)]
+
+    # Once the tombstone lapses, readers fill the shared tier again
+    redis.expire_all()
+    make_cache(redis).get(1, lambda: {'id': 1, 'role': 'admin'})
+    assert make_cache(redis).get(1, lambda: pytest.fail('not shared')) == {'id': 1, 'role': 'admin'}
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Left in the shared tier in place of an invalidated user; never valid JSON
+TOMBSTONE = '-'
+
+
+class UserCache:
+    """Two-tier cache of serialized users keyed by id.
+
+    The first tier is an in-process TTL/LRU map; the optional second tier is
+    Redis, shared by every replica. Invalidations are published on a Redis
+    channel so all replicas drop their local copy right away; if the
+    subscriber is down, the local TTL bounds how long stale data can live.
+
+    Shared fills only add missing entries (SET NX), and invalidation leaves
+    a short-lived tombstone instead of deleting the key. A reader that
+    loaded the user before the invalidation then fails its fill and does
+    not cache the old row in either tier; shared_tombstone_ttl must outlast
+    a loader call.
+    """
+
+    def __init__(self, ttl=30, max_size=10000, redis_client=None, shared_ttl=300,
+                 shared_tombstone_ttl=10, channel='auth:user-invalidate', key_prefix='auth:user:'):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.redis = redis_client
+        self.shared_ttl = shared_ttl
+        self.shared_tombstone_ttl = shared_tombstone_ttl
+        self.channel = channel
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._subscriber_pid = None
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_id, loader):
+        """Return the cached user dict, calling loader() on a miss.
+
+        loader returns the serialized user or None if it does not exist.
+        It must read from the primary, since what it returns is cached.
+        """
+        self._ensure_subscriber()
+        user_id = int(user_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self._stats['local_hits'] += 1
+                return entry[1]
+
+        cached = self._get_shared(user_id)
+        if cached is not None and cached != TOMBSTONE:
+            self._count('shared_hits')
+            user = json.loads(cached)
+        else:
+            self._count('misses')
+            user = loader()
+            if user is None:
+                return None
+            # Recently invalidated: this read is fresh, but the fill waits for the tombstone to lapse
+            if cached != TOMBSTONE and not self._set_shared(user_id, user):
+                return user
+
+        self._set_local(user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        user_id = int(user_id)
+        self._drop_local(user_id)
+        self._count('invalidations')
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(f"{self.key_prefix}{user_id}", TOMBSTONE, ex=self.shared_tombstone_ttl)
+            pipe.publish(self.channel, user_id)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"User cache invalidation broadcast failed for {user_id}: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _set_local(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _drop_local(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def _get_shared(self, user_id):
+        """The raw shared entry: user JSON, TOMBSTONE or None"""
+        if self.redis is None:
+            return None
+        try:
+            return self.redis.get(f"{self.key_prefix}{user_id}")
+        except Exception as e:
+            logger.warning(f"Shared user cache read failed: {e}")
+            return None
+
+    def _set_shared(self, user_id, user):
+        """Fill the shared tier; False if an entry or tombstone was already there"""
+        if self.redis is None:
+            return True
+        try:
+            return bool(self.redis.set(f"{self.key_prefix}{user_id}", json.dumps(user), ex=self.shared_ttl, nx=True))
+        except Exception as e:
+            logger.warning(f"Shared user cache write failed: {e}")
+            return True
+
+    def _ensure_subscriber(self):
+        # One listener thread per process, started lazily so it survives forking servers
+        if self.redis is None or self._subscriber_pid == os.getpid():
+            return
+        with self._lock:
+            if self._subscriber_pid == os.getpid():
+                return
+            self._subscriber_pid = os.getpid()
+        threading.Thread(target=self._listen, name='user-cache-invalidation', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything cached before the subscription may have missed an invalidation
+                with self._lock:
+                    self._entries.clear()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._drop_local(int(message['data']))
+            except Exception as e:
+                logger.warning(f"User cache invalidation listener error: {e}")
+                time.sleep(1)
@@ -0,0 +1,72 @@
+"""Apply cart-service schema migrations to every shard.
+
+Run once per deploy, before new app versions take traffic; the services
+themselves never create or alter tables. Each shard keeps its own
+schema_migrations table, so a shard appended to CART_SHARD_URLS is
+brought up to date on the next run. Migrations are append-only: add a
+new version for every schema change and raise REQUIRED_SCHEMA_VERSION
+in app.py once the code depends on it.
+
+Usage: python migrate.py [--status]
+"""
+import argparse
+import logging
+
+from app import create_app, shard_router, REQUIRED_SCHEMA_VERSION
+from schema_migrations import MigrationRunner
+
+logging.basicConfig(level=logging.INFO)
+
+# Version 1 is the schema db.metadata.create_all() produced when migrations
+# were introduced, frozen here so later model edits cannot change it. IF NOT
+# EXISTS keeps it a no-op on databases whose tables predate migrations.
+MIGRATIONS = [
+    (1, 'baseline schema', [
+        """
+        CREATE TABLE IF NOT EXISTS carts (
+            id SERIAL NOT NULL,
+            user_id INTEGER,
+            session_id VARCHAR(255),
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cart_items (
+            id SERIAL NOT NULL,
+            cart_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_name VARCHAR(255) NOT NULL,
+            price NUMERIC(10, 2) NOT NULL,
+            quantity INTEGER NOT NULL,
+            product_image_url VARCHAR(500),
+            added_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id),
+            FOREIGN KEY (cart_id) REFERENCES carts (id)
+        )
+        """
+    ])
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply cart-service schema migrations')
+    parser.add_argument('--status', action='store_true', help='show the schema version of each shard and exit')
+    args = parser.parse_args()
+
+    if MIGRATIONS[-1][0] < REQUIRED_SCHEMA_VERSION:
+        raise SystemExit(f"app.py requires schema {REQUIRED_SCHEMA_VERSION} but the newest migration is {MIGRATIONS[-1][0]}")
+
+    with create_app().app_context():
+        for name in shard_router.names:
+            runner = MigrationRunner(shard_router.engine(name), MIGRATIONS)
+            if args.status:
+                print(f"{name}: schema version {runner.current()} (latest {runner.latest}, required {REQUIRED_SCHEMA_VERSION})")
+                continue
+            applied = runner.run()
+            print(f"{name}: applied migrations {applied}" if applied else f"{name}: schema is up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import contextlib
+import threading
+import time
+from decimal import Decimal
+
+import requests
+
+from tracing import inject
+
+
+class ProductCatalog:
+    """Short-TTL, process-wide cache of product_id -> price/stock snapshots.
+
+    Misses are resolved with a single batched call to product-service
+    (GET /products?ids=...), so revalidating a cart costs at most one
+    upstream request regardless of how many lines it has. With a tracer,
+    each lookup is a client span propagated to product-service.
+    """
+
+    def __init__(self, base_url, ttl=30, timeout=3, max_batch=200, tracer=None):
+        self.base_url = base_url.rstrip('/')
+        self.tracer = tracer
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def get_many(self, product_ids):
+        """Return {product_id: product or None} for the given ids.
+
+        None means product-service does not know the product (or it is
+        inactive). Raises requests.RequestException if the lookup fails.
+        """
+        now = time.monotonic()
+        found = {}
+        missing = []
+
+        with self._lock:
+            for product_id in set(product_ids):
+                entry = self._entries.get(product_id)
+                if entry and entry[0] > now:
+                    found[product_id] = entry[1]
+                else:
+                    missing.append(product_id)
+
+        if missing:
+            fetched = self._fetch(missing)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                for product_id in missing:
+                    product = fetched.get(product_id)
+                    self._entries[product_id] = (expires_at, product)
+                    found[product_id] = product
+
+        return found
+
+    def invalidate(self, product_ids=None):
+        with self._lock:
+            if product_ids is None:
+                self._entries.clear()
+            else:
+                for product_id in product_ids:
+                    self._entries.pop(product_id, None)
+
+    def _span(self, count):
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.span('product-service lookup', kind='client', products=count)
+
+    def _fetch(self, product_ids):
+        products = {}
+        for start in range(0, len(product_ids), self.max_batch):
+            chunk = product_ids[start:start + self.max_batch]
+            with self._span(len(chunk)):
+                response = self._session.get(
+                    f"{self.base_url}/products",
+                    params={'ids': ','.join(str(pid) for pid in chunk)},
+                    headers=inject({}),
+                    timeout=self.timeout
+                )
+            response.raise_for_status()
+            for product in response.json() or []:
+                products[product['id']] = {
+                    'name': product['name'],
+                    'price': Decimal(str(product['price'])).quantize(Decimal('0.01')),
+                    'stock': product.get('stock', 0),
+                    'image_url': product.get('image_url')
+                }
+        return products
@@ -0,0 +1,69 @@
+"""Move carts to their owning shard after CART_SHARD_URLS has grown.
+
+Deploy the service with the extended CART_SHARD_URLS and
+CART_SHARD_PREVIOUS_COUNT set to the old shard count first; requests then
+pull carts across lazily while this script moves the rest in batches.
+Once it reports nothing left to move, CART_SHARD_PREVIOUS_COUNT can be
+unset.
+
+Usage: python rebalance_carts.py [--batch-size 500] [--dry-run]
+"""
+import argparse
+
+from app import create_app, shard_router, Cart, move_cart
+from sharding import cart_shard_key
+
+
+def owner_key(cart):
+    if cart.user_id is not None:
+        return cart_shard_key(user_id=cart.user_id)
+    return cart_shard_key(cart_token=cart.session_id)
+
+
+def rebalance(batch_size=500, dry_run=False):
+    moved = {}
+    for name in shard_router.names:
+        source = shard_router.session(name)
+        last_id = 0
+        while True:
+            batch = (
+                source.query(Cart)
+                .filter(Cart.id > last_id)
+                .order_by(Cart.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for cart in batch:
+                target_name = shard_router.shard_for(owner_key(cart))
+                if target_name == name:
+                    continue
+                key = f"{name} -> {target_name}"
+                moved[key] = moved.get(key, 0) + 1
+                if not dry_run:
+                    move_cart(source, shard_router.session(target_name), cart)
+
+            source.expunge_all()
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebalance carts across shards')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        moved = rebalance(batch_size=args.batch_size, dry_run=args.dry_run)
+
+    if not moved:
+        print('All carts are on their owning shard')
+    for route, count in sorted(moved.items()):
+        print(f"{'Would move' if args.dry_run else 'Moved'} {count} carts {route}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import bisect
+import hashlib
+
+from flask import g
+from sqlalchemy.orm import Session
+
+from replicas import ReplicaRoutingMixin
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring over shard names.
+
+    Each shard is placed on the ring many times (virtual nodes) so keys
+    spread evenly, and adding a shard only moves roughly 1/n of the keys.
+    """
+
+    def __init__(self, names, vnodes=128):
+        self.names = list(names)
+        self._points = []
+        self._owners = []
+        ring = sorted(
+            (_hash(f"{name}#{replica}"), name)
+            for name in self.names
+            for replica in range(vnodes)
+        )
+        for point, name in ring:
+            self._points.append(point)
+            self._owners.append(name)
+
+    def get(self, key):
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+def shard_names(count):
+    # Shards are named by position, so appending URLs keeps existing names stable
+    return [f"shard-{index}" for index in range(count)]
+
+
+def bind_key_for(name):
+    """Flask-SQLAlchemy bind key for a shard; shard-0 is the default engine"""
+    return None if name == 'shard-0' else name
+
+
+class ShardSession(ReplicaRoutingMixin, Session):
+    """Session bound to one shard's primary, routing reads to its replicas"""
+
+
+class ShardRouter:
+    """Routes cart keys to per-shard sessions.
+
+    Engines are the Flask-SQLAlchemy engines configured through
+    SQLALCHEMY_DATABASE_URI (shard-0) and SQLALCHEMY_BINDS (shard-1..n).
+    Sessions are opened lazily per request and closed on teardown; with a
+    ReplicaRouter, their reads may be served by the shard's replicas.
+    """
+
+    def __init__(self, db, shard_count, previous_count=None, replica_router=None):
+        self.db = db
+        self.replica_router = replica_router
+        self.ring = HashRing(shard_names(shard_count))
+        self.previous_ring = None
+        if previous_count and previous_count != shard_count:
+            self.previous_ring = HashRing(shard_names(previous_count))
+
+    @property
+    def names(self):
+        return self.ring.names
+
+    def shard_for(self, key):
+        return self.ring.get(key)
+
+    def previous_shard_for(self, key):
+        """Owner of key before the last resize, if a rebalance is in progress"""
+        if self.previous_ring is None:
+            return None
+        previous = self.previous_ring.get(key)
+        return previous if previous != self.ring.get(key) else None
+
+    def engine(self, name):
+        return self.db.engines[bind_key_for(name)]
+
+    def session(self, name):
+        sessions = g.setdefault('_cart_shard_sessions', {})
+        if name not in sessions:
+            sessions[name] = ShardSession(
+                bind=self.engine(name),
+                info={'replica_router': self.replica_router, 'bind_key': bind_key_for(name)}
+            )
+        return sessions[name]
+
+    def session_for(self, key):
+        return self.session(self.shard_for(key))
+
+    def close_sessions(self, exc=None):
+        sessions = g.pop('_cart_shard_sessions', {})
+        for session in sessions.values():
+            if exc is not None:
+                session.rollback()
+            session.close()
+
+
+def cart_shard_key(user_id=None, cart_token=None):
+    if user_id is not None:
+        return f"user:{int(user_id)}"
+    return f"guest:{cart_token}"
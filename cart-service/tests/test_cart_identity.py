@@ -0,0 +1,66 @@
+"""Whose cart a request acts on, given its token and headers."""
+import os
+import sys
+import time
+import uuid
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as cart_app  # noqa: E402
+
+KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class SigningKey:
+    key = KEY.public_key()
+
+
+@pytest.fixture(scope='module')
+def app():
+    return cart_app.create_app()
+
+
+@pytest.fixture(autouse=True)
+def local_keys(monkeypatch):
+    # Tokens in these tests are signed here rather than by auth-service
+    monkeypatch.setattr(cart_app.jwks_client, 'get_signing_key', lambda kid: SigningKey())
+    monkeypatch.setattr(cart_app.revocation_list, 'is_revoked', lambda payload: False)
+
+
+def token(sub, **claims):
+    now = int(time.time())
+    return jwt.encode(
+        dict({'sub': sub, 'type': 'access', 'fresh': False, 'jti': uuid.uuid4().hex,
+              'iat': now, 'nbf': now, 'exp': now + 60}, **claims),
+        KEY,
+        algorithm='RS256',
+        headers={'kid': 'test'}
+    )
+
+
+def user_for(app, headers):
+    with app.test_request_context('/api/cart', headers=headers):
+        cart_app.authenticate()
+        return cart_app.current_user_id()
+
+
+def test_customer_token_acts_for_its_subject(app):
+    assert user_for(app, {'Authorization': f"Bearer {token('7')}"}) == '7'
+
+
+def test_customer_token_cannot_name_another_user(app):
+    headers = {'Authorization': f"Bearer {token('7', role='customer')}", 'X-User-ID': '8'}
+    assert user_for(app, headers) == '7'
+
+
+def test_guest_cannot_name_a_user(app):
+    assert user_for(app, {'X-User-ID': '8', 'X-Cart-Token': 'guest-token'}) is None
+
+
+def test_service_token_acts_for_the_named_user(app):
+    headers = {'Authorization': f"Bearer {token('service:order-service', role='service')}", 'X-User-ID': '8'}
+    assert user_for(app, headers) == '8'
@@ -0,0 +1,47 @@
+"""Consistent hashing of cart keys onto shards."""
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import HashRing, ShardRouter, cart_shard_key, shard_names  # noqa: E402
+
+KEYS = [cart_shard_key(user_id=user_id) for user_id in range(20000)]
+
+
+def test_placement_is_deterministic():
+    first, second = HashRing(shard_names(4)), HashRing(shard_names(4))
+
+    assert [first.get(key) for key in KEYS] == [second.get(key) for key in KEYS]
+
+
+def test_keys_spread_evenly():
+    ring = HashRing(shard_names(4))
+
+    counts = Counter(ring.get(key) for key in KEYS)
+
+    assert set(counts) == set(shard_names(4))
+    assert max(counts.values()) < 1.3 * len(KEYS) / 4
+
+
+def test_adding_a_shard_only_moves_keys_onto_it():
+    before, after = HashRing(shard_names(4)), HashRing(shard_names(5))
+
+    moved = [key for key in KEYS if before.get(key) != after.get(key)]
+
+    assert all(after.get(key) == 'shard-4' for key in moved)
+    # About a fifth of the keys move, not the four fifths a modulo scheme would
+    assert 0.1 < len(moved) / len(KEYS) < 0.3
+
+
+def test_router_reports_the_previous_owner_only_for_moved_keys():
+    router = ShardRouter(db=None, shard_count=5, previous_count=4)
+    previous = HashRing(shard_names(4))
+
+    for key in KEYS[:2000]:
+        owner = router.shard_for(key)
+        expected = previous.get(key) if previous.get(key) != owner else None
+        assert router.previous_shard_for(key) == expected
+
+    assert ShardRouter(db=None, shard_count=4).previous_shard_for(KEYS[0]) is None
@@ -1,4 +1,5 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react'
+import axios from 'axios'
 import { authAPI } from '../services/api'
 
 interface User {
@@ -36,8 +37,12 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
           setUser(userData)
         } catch (error) {
           console.error('Failed to fetch user profile:', error)
-          localStorage.removeItem('token')
-          setToken(null)
+          // The client already tried a refresh; a 401 now means the session is gone
+          if (axios.isAxiosError(error) && error.response?.status === 401) {
+            localStorage.removeItem('token')
+            localStorage.removeItem('refresh_token')
+            setToken(null)
+          }
         }
       }
       setIsLoading(false)
@@ -52,6 +57,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       setToken(response.token)
       setUser(response.user)
       localStorage.setItem('token', response.token)
+      localStorage.setItem('refresh_token', response.refresh_token)
     } catch (error) {
       throw error
     }
@@ -63,15 +69,21 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       setToken(response.token)
       setUser(response.user)
       localStorage.setItem('token', response.token)
+      localStorage.setItem('refresh_token', response.refresh_token)
     } catch (error) {
       throw error
     }
   }
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (token) {
+      authAPI.logout(refreshToken).catch((error) => console.error('Failed to revoke session:', error))
+    }
     setUser(null)
     setToken(null)
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
   }
 
   const value: AuthContextType = {
@@ -0,0 +1,69 @@
+import { afterEach, beforeEach, describe, expect, it, vi } from 'vitest'
+import axios, { AxiosError, AxiosResponse, InternalAxiosRequestConfig } from 'axios'
+import apiClient, { authAPI } from './api'
+
+const respond = (config: InternalAxiosRequestConfig, status: number, data: unknown) => {
+  const response = { config, status, data, statusText: '', headers: {} } as AxiosResponse
+  return status < 400
+    ? Promise.resolve(response)
+    : Promise.reject(new AxiosError('Request failed', 'ERR_BAD_REQUEST', config, null, response))
+}
+
+// The gateway accepts only the refreshed access token
+const gateway = vi.fn((config: InternalAxiosRequestConfig) =>
+  config.headers.Authorization === 'Bearer fresh'
+    ? respond(config, 200, { url: config.url })
+    : respond(config, 401, { error: 'Invalid or expired token' })
+)
+
+describe('apiClient token refresh', () => {
+  const originalAdapter = apiClient.defaults.adapter
+
+  beforeEach(() => {
+    localStorage.setItem('token', 'expired')
+    localStorage.setItem('refresh_token', 'refresh-1')
+    apiClient.defaults.adapter = gateway
+    vi.spyOn(axios, 'post').mockResolvedValue({ data: { token: 'fresh', refresh_token: 'refresh-2' } })
+  })
+
+  afterEach(() => {
+    apiClient.defaults.adapter = originalAdapter
+    gateway.mockClear()
+    vi.restoreAllMocks()
+    localStorage.clear()
+  })
+
+  it('refreshes an expired access token and retries the request', async () => {
+    const response = await apiClient.get('/cart')
+
+    expect(response.data).toEqual({ url: '/cart' })
+    expect(axios.post).toHaveBeenCalledTimes(1)
+    expect(axios.post).toHaveBeenCalledWith('/api/auth/refresh', null, {
+      headers: { Authorization: 'Bearer refresh-1' },
+    })
+    expect(localStorage.getItem('token')).toBe('fresh')
+    expect(localStorage.getItem('refresh_token')).toBe('refresh-2')
+  })
+
+  it('refreshes for the profile lookup made on page load', async () => {
+    const profile = await authAPI.getProfile('expired')
+
+    expect(profile).toEqual({ url: '/auth/profile' })
+    expect(localStorage.getItem('token')).toBe('fresh')
+  })
+
+  it('does not refresh when login itself is rejected', async () => {
+    await expect(authAPI.login('alice', 'wrong-password')).rejects.toBeInstanceOf(AxiosError)
+
+    expect(axios.post).not.toHaveBeenCalled()
+  })
+
+  it('logs out when the refresh token is rejected too', async () => {
+    vi.mocked(axios.post).mockRejectedValueOnce(new Error('Invalid refresh token'))
+
+    await expect(apiClient.get('/cart')).rejects.toBeInstanceOf(AxiosError)
+
+    expect(localStorage.getItem('token')).toBeNull()
+    expect(localStorage.getItem('refresh_token')).toBeNull()
+  })
+})
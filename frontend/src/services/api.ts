@@ -25,12 +25,51 @@ apiClient.interceptors.request.use(
   }
 )
 
+// Access tokens are short-lived; share one refresh between concurrent 401s
+let refreshInFlight: Promise<string> | null = null
+
+const refreshAccessToken = (): Promise<string> => {
+  if (!refreshInFlight) {
+    const refreshToken = localStorage.getItem('refresh_token')
+    refreshInFlight = (refreshToken
+      ? axios.post(`${API_BASE_URL}/auth/refresh`, null, {
+          headers: { Authorization: `Bearer ${refreshToken}` },
+        })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        localStorage.setItem('token', response.data.token)
+        localStorage.setItem('refresh_token', response.data.refresh_token)
+        return response.data.token as string
+      })
+      .finally(() => {
+        refreshInFlight = null
+      })
+  }
+  return refreshInFlight
+}
+
+// A 401 from these means bad credentials or a dead session, not an expired access token
+const NO_REFRESH_PATHS = ['/auth/refresh', '/auth/login', '/auth/register', '/auth/logout']
+
 // Response interceptor for error handling
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config
+    if (error.response?.status === 401 && original && !original._retried && !NO_REFRESH_PATHS.includes(original.url)) {
+      original._retried = true
+      try {
+        const token = await refreshAccessToken()
+        original.headers.Authorization = `Bearer ${token}`
+        return apiClient(original)
+      } catch (refreshError) {
+        // Fall through to the login redirect below
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('token')
+      localStorage.removeItem('refresh_token')
       window.location.href = '/login'
     }
     return Promise.reject(error)
@@ -57,7 +96,12 @@ export const authAPI = {
   },
 
   refreshToken: async () => {
-    const response = await apiClient.post('/auth/refresh')
+    const token = await refreshAccessToken()
+    return { token }
+  },
+
+  logout: async (refreshToken: string | null) => {
+    const response = await apiClient.post('/auth/logout', { refresh_token: refreshToken })
     return response.data
   },
 }
@@ -95,6 +139,57 @@ export const productsAPI = {
   },
 }
 
+// Orders API endpoints
+const TERMINAL_ORDER_STATUSES = ['delivered', 'cancelled']
+
+export const ordersAPI = {
+  // Live status updates. EventSource cannot send the Authorization header,
+  // so each (re)connect first trades the access token for a short-lived
+  // stream token and resumes after the last event received.
+  watchStatus: (orderNumber: string, onStatus: (status: string) => void) => {
+    const path = `/orders/${encodeURIComponent(orderNumber)}/events`
+    let source: EventSource | null = null
+    let lastEventId: string | null = null
+    let closed = false
+    let retry: ReturnType<typeof setTimeout> | undefined
+
+    const connect = async () => {
+      try {
+        const { data } = await apiClient.post(`${path}/token`)
+        if (closed) return
+        const params = new URLSearchParams({ token: data.token })
+        if (lastEventId) params.set('last_event_id', lastEventId)
+        source = new EventSource(`${API_BASE_URL}${path}?${params}`)
+        source.addEventListener('status', (event) => {
+          const message = event as MessageEvent
+          const { status } = JSON.parse(message.data)
+          lastEventId = message.lastEventId
+          onStatus(status)
+          // The server ends the stream after a final status; don't reconnect
+          if (TERMINAL_ORDER_STATUSES.includes(status)) {
+            closed = true
+            source?.close()
+          }
+        })
+        source.onerror = () => {
+          // The token may have expired; reconnect with a fresh one
+          source?.close()
+          if (!closed) retry = setTimeout(connect, 3000)
+        }
+      } catch (error) {
+        if (!closed) retry = setTimeout(connect, 3000)
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      source?.close()
+    }
+  },
+}
+
 // Analytics API endpoints
 export const analyticsAPI = {
   getDashboardStats: async () => {
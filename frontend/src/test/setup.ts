@@ -0,0 +1 @@
+import '@testing-library/jest-dom'
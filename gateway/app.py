@@ -1,9 +1,12 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import logging
 from urllib.parse import urljoin
+from request_logging import RequestLogger
+from tracing import inject, tracer_from_env
 
 app = Flask(__name__)
 CORS(app)
@@ -12,6 +15,24 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sampled, structured request log; errors and slow requests are always logged
+RequestLogger(
+    app,
+    service='gateway',
+    sample_rate=float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 0.01)),
+    slow_ms=float(os.getenv('REQUEST_LOG_SLOW_MS', 1000))
+)
+
+# Every request is traced here first; services join the trace through traceparent
+tracer = tracer_from_env('gateway')
+tracer.init_app(app)
+
+# Keep-alive connections to the services, one pool slot per concurrent request
+upstream = requests.Session()
+upstream_adapter = HTTPAdapter(pool_maxsize=int(os.getenv('UPSTREAM_POOL_SIZE', 10)), max_retries=0)
+upstream.mount('http://', upstream_adapter)
+upstream.mount('https://', upstream_adapter)
+
 # Service URLs
 SERVICES = {
     'auth': os.getenv('AUTH_SERVICE_URL', 'http://auth-service:5001'),
@@ -33,15 +54,21 @@ def forward_request(service_name, path):
         # Forward headers (especially Authorization)
         headers = {key: value for key, value in request.headers if key != 'Host'}
         
-        # Forward the request
-        response = requests.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            data=request.get_data(),
-            params=request.args,
-            timeout=30
-        )
+        # Forward the request as a client span; its traceparent replaces the caller's
+        with tracer.span(f"{service_name} {request.method}", kind='client', **{
+            'peer.service': service_name,
+            'http.target': path
+        }) as span:
+            response = upstream.request(
+                method=request.method,
+                url=url,
+                headers=inject(headers),
+                data=request.get_data(),
+                params=request.args,
+                timeout=30
+            )
+            span.set_attribute('http.status_code', response.status_code)
+            span.error = response.status_code >= 500
         
         return response.content, response.status_code, response.headers.items()
         
@@ -7,7 +7,9 @@ const { createProxyMiddleware } = require('http-proxy-middleware');
 const redis = require('redis');
 const jwt = require('jsonwebtoken');
 const winston = require('winston');
+const crypto = require('crypto');
 require('dotenv').config();
+const { tracerFromEnv } = require('./tracing');
 
 const app = express();
 const PORT = process.env.PORT || 5000;
@@ -39,14 +41,22 @@ try {
   logger.error('Failed to connect to Redis:', error);
 }
 
+// Every request is a gateway span, joined to the caller's trace or starting one;
+// proxied requests pass its traceparent on, so service spans nest under it
+const tracer = tracerFromEnv('api-gateway', logger);
+app.use(tracer.middleware());
+
 // Middleware
 app.use(helmet());
-app.use(compression());
+app.use(compression({
+  // Server-sent events must be flushed as they arrive, not buffered for compression
+  filter: (req, res) => !String(res.getHeader('Content-Type') || '').includes('text/event-stream') && compression.filter(req, res)
+}));
 app.use(cors({
   origin: ['http://localhost', 'http://localhost:3000', 'http://localhost:80'],
   credentials: true,
   methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-  allowedHeaders: ['Content-Type', 'Authorization', 'X-Cart-Token']
+  allowedHeaders: ['Content-Type', 'Authorization', 'X-Cart-Token', 'Idempotency-Key', 'traceparent']
 }));
 
 app.use(express.json({ limit: '10mb' }));
@@ -83,9 +93,10 @@ const authenticateToken = (req, res, next) => {
     return res.status(401).json({ error: 'Access token required' });
   }
 
-  jwt.verify(token, process.env.JWT_SECRET_KEY || 'your-secret-key', (err, user) => {
+  jwt.verify(token, getSigningKey, { algorithms: ['RS256'] }, (err, user) => {
+    // 401, not 403: an expired access token is the client's cue to refresh it
     if (err) {
-      return res.status(403).json({ error: 'Invalid or expired token' });
+      return res.status(401).json({ error: 'Invalid or expired token' });
     }
     req.user = user;
     next();
@@ -101,6 +112,56 @@ const services = {
   order: process.env.ORDER_SERVICE_URL || 'http://order-service:5005'
 };
 
+// JWKS cache: tokens are verified locally against auth-service's public keys
+const jwksUrl = process.env.JWKS_URL || `${services.auth}/api/auth/.well-known/jwks.json`;
+const jwksTtlMs = (parseInt(process.env.JWKS_CACHE_TTL, 10) || 300) * 1000;
+const jwksMinRefreshMs = 10 * 1000;
+const jwks = { keys: new Map(), fetchedAt: 0, inflight: null };
+
+const refreshJwks = () => {
+  if (!jwks.inflight) {
+    jwks.inflight = fetch(jwksUrl, { signal: AbortSignal.timeout(5000) })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`JWKS fetch failed with status ${response.status}`);
+        }
+        return response.json();
+      })
+      .then((body) => {
+        jwks.keys = new Map(body.keys.map((jwk) => [jwk.kid, crypto.createPublicKey({ key: jwk, format: 'jwk' })]));
+        jwks.fetchedAt = Date.now();
+      })
+      .finally(() => {
+        jwks.inflight = null;
+      });
+  }
+  return jwks.inflight;
+};
+
+const getSigningKey = (header, callback) => {
+  const age = Date.now() - jwks.fetchedAt;
+  const cached = jwks.keys.get(header.kid);
+
+  if (cached && age < jwksTtlMs) {
+    return callback(null, cached);
+  }
+  // Unknown kid right after a refresh: don't let bad tokens hammer auth-service
+  if (!cached && age < jwksMinRefreshMs) {
+    return callback(new Error('Unknown signing key'));
+  }
+
+  refreshJwks()
+    .then(() => {
+      const key = jwks.keys.get(header.kid);
+      return key ? callback(null, key) : callback(new Error('Unknown signing key'));
+    })
+    .catch((err) => {
+      logger.error('JWKS refresh failed:', err);
+      // Keep verifying with the last known keys while auth-service is unreachable
+      return cached ? callback(null, cached) : callback(err);
+    });
+};
+
 // Proxy configurations
 const createProxy = (target, pathRewrite = {}) => createProxyMiddleware({
   target,
@@ -111,10 +172,13 @@ const createProxy = (target, pathRewrite = {}) => createProxyMiddleware({
     res.status(503).json({ error: 'Service temporarily unavailable' });
   },
   onProxyReq: (proxyReq, req, res) => {
+    proxyReq.setHeader('traceparent', req.span.traceparent());
     // Forward user info if authenticated
     if (req.user) {
-      proxyReq.setHeader('X-User-ID', req.user.id);
-      proxyReq.setHeader('X-User-Email', req.user.email);
+      proxyReq.setHeader('X-User-ID', String(req.user.sub));
+      if (req.user.email) {
+        proxyReq.setHeader('X-User-Email', req.user.email);
+      }
     }
   }
 });
@@ -127,7 +191,8 @@ app.get('/health', (req, res) => {
     version: '1.0.0',
     services: {
       redis: redisClient?.isReady ? 'connected' : 'disconnected'
-    }
+    },
+    tracing: tracer.stats()
   });
 });
 
@@ -167,8 +232,17 @@ app.use('/api/cart', (req, res, next) => {
 // Payment routes (authentication required)
 app.use('/api/payments', authenticateToken, createProxy(services.payment, { '^/api/payments': '' }));
 
-// Order routes (authentication required)
-app.use('/api/orders', authenticateToken, createProxy(services.order, { '^/api/orders': '' }));
+// Order routes (authentication required). EventSource cannot send an
+// Authorization header, so status streams opened with a stream token
+// (?token=) go through and order-service checks the token itself.
+const authenticateOrders = (req, res, next) => {
+  if (req.method === 'GET' && req.query.token && /^\/[^/]+\/events$/.test(req.path)) {
+    return next();
+  }
+  return authenticateToken(req, res, next);
+};
+
+app.use('/api/orders', authenticateOrders, createProxy(services.order, { '^/api/orders': '' }));
 
 // Catch-all for undefined routes
 app.use('/api/*', (req, res) => {
@@ -188,6 +262,7 @@ app.use((err, req, res, next) => {
 // Graceful shutdown
 process.on('SIGTERM', async () => {
   logger.info('SIGTERM received, shutting down gracefully');
+  await tracer.exporter?.flush();
   
   if (redisClient) {
     await redisClient.quit();
@@ -198,6 +273,7 @@ process.on('SIGTERM', async () => {
 
 process.on('SIGINT', async () => {
   logger.info('SIGINT received, shutting down gracefully');
+  await tracer.exporter?.flush();
   
   if (redisClient) {
     await redisClient.quit();
@@ -206,9 +282,12 @@ process.on('SIGINT', async () => {
   process.exit(0);
 });
 
-app.listen(PORT, '0.0.0.0', () => {
-  logger.info(`API Gateway running on port ${PORT}`);
-  logger.info('Service endpoints:', services);
-});
+// Tests import the app without starting a server
+if (require.main === module) {
+  app.listen(PORT, '0.0.0.0', () => {
+    logger.info(`API Gateway running on port ${PORT}`);
+    logger.info('Service endpoints:', services);
+  });
+}
 
 module.exports = app;
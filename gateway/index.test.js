@@ -0,0 +1,51 @@
+const crypto = require('crypto');
+const jwt = require('jsonwebtoken');
+const request = require('supertest');
+
+jest.mock('redis', () => ({
+  createClient: () => ({ connect: jest.fn().mockResolvedValue(), on: jest.fn(), quit: jest.fn(), isReady: false })
+}));
+
+const { privateKey, publicKey } = crypto.generateKeyPairSync('rsa', { modulusLength: 2048 });
+const KID = 'test-key';
+
+// Nothing listens here, so requests that pass authentication end in the proxy's 503
+process.env.PAYMENT_SERVICE_URL = 'http://127.0.0.1:9';
+global.fetch = jest.fn(async () => ({
+  ok: true,
+  json: async () => ({ keys: [{ ...publicKey.export({ format: 'jwk' }), kid: KID, use: 'sig', alg: 'RS256' }] })
+}));
+
+const app = require('./index');
+
+const sign = (claims = {}, options = {}) => jwt.sign(
+  { sub: '1', type: 'access', ...claims },
+  privateKey,
+  { algorithm: 'RS256', keyid: KID, expiresIn: '15m', ...options }
+);
+
+describe('authenticateToken', () => {
+  it('requires a token', async () => {
+    const response = await request(app).get('/api/payments');
+    expect(response.status).toBe(401);
+  });
+
+  it('answers an expired access token with 401 so the client refreshes it', async () => {
+    const token = sign({ iat: Math.floor(Date.now() / 1000) - 3600 }, { expiresIn: '15m' });
+    const response = await request(app).get('/api/payments').set('Authorization', `Bearer ${token}`);
+    expect(response.status).toBe(401);
+    expect(response.body).toEqual({ error: 'Invalid or expired token' });
+  });
+
+  it('answers a token signed with another key with 401', async () => {
+    const { privateKey: otherKey } = crypto.generateKeyPairSync('rsa', { modulusLength: 2048 });
+    const token = jwt.sign({ sub: '1' }, otherKey, { algorithm: 'RS256', keyid: KID, expiresIn: '15m' });
+    const response = await request(app).get('/api/payments').set('Authorization', `Bearer ${token}`);
+    expect(response.status).toBe(401);
+  });
+
+  it('lets a valid token through to the service', async () => {
+    const response = await request(app).get('/api/payments').set('Authorization', `Bearer ${sign()}`);
+    expect(response.status).toBe(503);
+  });
+});
@@ -0,0 +1,233 @@
+// W3C trace context for the gateway, the Node counterpart of shared/tracing.py.
+// Spans use the same fields, sinks and TRACE_* settings, so the gateway's
+// span sits at the root of each trace the Python services record.
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+
+const TRACEPARENT = /^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/;
+const SPAN_KINDS = { internal: 1, server: 2, client: 3 };
+
+// [traceId, parent span id, sampled] from a traceparent header, or null if invalid
+const parseTraceparent = (value) => {
+  const match = TRACEPARENT.exec(String(value || '').trim().toLowerCase());
+  if (!match || match[1] === 'ff' || /^0+$/.test(match[2]) || /^0+$/.test(match[3])) {
+    return null;
+  }
+  return [match[2], match[3], (parseInt(match[4], 16) & 1) === 1];
+};
+
+// hrtime is monotonic but not wall-clock; anchor it once so spans line up with the services'
+const EPOCH_OFFSET_NS = BigInt(Date.now()) * 1000000n - process.hrtime.bigint();
+const nowNs = () => process.hrtime.bigint() + EPOCH_OFFSET_NS;
+
+class Span {
+  constructor(name, kind, traceId, parentId, sampled) {
+    this.name = name;
+    this.kind = kind;
+    this.traceId = traceId;
+    this.spanId = crypto.randomBytes(8).toString('hex');
+    this.parentId = parentId;
+    this.sampled = sampled;
+    this.startNs = nowNs();
+    this.endNs = null;
+    this.attributes = {};
+    this.error = false;
+  }
+
+  traceparent() {
+    return `00-${this.traceId}-${this.spanId}-${this.sampled ? '01' : '00'}`;
+  }
+
+  toDict() {
+    return {
+      trace_id: this.traceId,
+      span_id: this.spanId,
+      parent_id: this.parentId,
+      name: this.name,
+      kind: this.kind,
+      start_ns: Number(this.startNs),
+      end_ns: Number(this.endNs),
+      duration_ms: Math.round(Number(this.endNs - this.startNs) / 1e3) / 1e3,
+      attributes: this.attributes,
+      error: this.error
+    };
+  }
+}
+
+// Appends spans as JSON lines; the local stand-in for a collector
+class FileSpanSink {
+  constructor(file) {
+    this.file = file;
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+  }
+
+  write(service, spans) {
+    const lines = spans.map((span) => JSON.stringify({ ...span.toDict(), service })).join('\n') + '\n';
+    return fs.promises.appendFile(this.file, lines);
+  }
+}
+
+const otlpAttribute = (key, value) => {
+  if (typeof value === 'boolean') return { key, value: { boolValue: value } };
+  if (Number.isInteger(value)) return { key, value: { intValue: String(value) } };
+  if (typeof value === 'number') return { key, value: { doubleValue: value } };
+  return { key, value: { stringValue: String(value) } };
+};
+
+// Posts spans to an OpenTelemetry collector's OTLP/HTTP JSON endpoint
+class OTLPHttpSink {
+  constructor(endpoint, timeoutMs = 2000) {
+    this.url = `${endpoint.replace(/\/+$/, '')}/v1/traces`;
+    this.timeoutMs = timeoutMs;
+  }
+
+  async write(service, spans) {
+    const response = await fetch(this.url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      signal: AbortSignal.timeout(this.timeoutMs),
+      body: JSON.stringify({
+        resourceSpans: [{
+          resource: { attributes: [otlpAttribute('service.name', service)] },
+          scopeSpans: [{
+            scope: { name: 'tracing' },
+            spans: spans.map((span) => ({
+              traceId: span.traceId,
+              spanId: span.spanId,
+              parentSpanId: span.parentId || '',
+              name: span.name,
+              kind: SPAN_KINDS[span.kind],
+              startTimeUnixNano: String(span.startNs),
+              endTimeUnixNano: String(span.endNs),
+              attributes: Object.entries(span.attributes).map(([key, value]) => otlpAttribute(key, value)),
+              status: { code: span.error ? 2 : 1 }
+            }))
+          }]
+        }]
+      })
+    });
+    if (!response.ok) {
+      throw new Error(`OTLP export failed with status ${response.status}`);
+    }
+  }
+}
+
+// Non-blocking export: export() only queues; a timer writes what has
+// collected once per interval, in batches of batchSize. Spans that do not
+// fit in the queue are counted and dropped.
+class BatchSpanExporter {
+  constructor(sink, service, { maxQueue = 2048, batchSize = 256, intervalMs = 1000, logger = console } = {}) {
+    this.sink = sink;
+    this.service = service;
+    this.maxQueue = maxQueue;
+    this.batchSize = batchSize;
+    this.logger = logger;
+    this.queue = [];
+    this.stats = { exported: 0, dropped: 0, failed_batches: 0 };
+    this.timer = setInterval(() => this.flush(), intervalMs);
+    this.timer.unref();
+  }
+
+  export(span) {
+    if (this.queue.length >= this.maxQueue) {
+      this.stats.dropped += 1;
+      return;
+    }
+    this.queue.push(span);
+  }
+
+  async flush() {
+    while (this.queue.length) {
+      const batch = this.queue.splice(0, this.batchSize);
+      try {
+        await this.sink.write(this.service, batch);
+        this.stats.exported += batch.length;
+      } catch (err) {
+        this.stats.failed_batches += 1;
+        this.stats.dropped += batch.length;
+        this.logger.warn(`Span export failed: ${err.message}`);
+      }
+    }
+  }
+
+  snapshot() {
+    return { ...this.stats, queued: this.queue.length };
+  }
+}
+
+// Every request becomes a server span joined to the caller's trace, or the
+// root of a new one sampled at sampleRate. Proxied requests carry
+// req.span.traceparent(), so the services' spans are children of the
+// gateway's and the gateway hop has its own timing.
+class Tracer {
+  constructor(service, exporter = null, sampleRate = 1.0) {
+    this.service = service;
+    this.exporter = exporter;
+    this.sampleRate = sampleRate;
+  }
+
+  middleware() {
+    return (req, res, next) => {
+      const parent = parseTraceparent(req.headers.traceparent);
+      // Name by mount point (/api/orders), not the full path, to keep span names bounded
+      const route = req.path.split('/').slice(0, 3).join('/') || '/';
+      const span = parent
+        ? new Span(`${req.method} ${route}`, 'server', parent[0], parent[1], parent[2])
+        : new Span(`${req.method} ${route}`, 'server', crypto.randomBytes(16).toString('hex'), null,
+          Math.random() < this.sampleRate);
+      span.attributes['http.method'] = req.method;
+      span.attributes['http.route'] = route;
+      req.span = span;
+      res.setHeader('X-Trace-Id', span.traceId);
+
+      let finished = false;
+      const finish = () => {
+        if (finished) return;
+        finished = true;
+        span.attributes['http.status_code'] = res.statusCode;
+        // 'close' without 'finish': the client went away first (ends every SSE stream)
+        span.attributes['http.client_closed'] = !res.writableFinished;
+        span.error = res.statusCode >= 500;
+        this.finish(span);
+      };
+      res.on('finish', finish);
+      res.on('close', finish);
+      next();
+    };
+  }
+
+  finish(span) {
+    span.endNs = nowNs();
+    if (span.sampled && this.exporter) {
+      this.exporter.export(span);
+    }
+  }
+
+  stats() {
+    return this.exporter ? this.exporter.snapshot() : { exporter: null };
+  }
+}
+
+// Tracer configured by TRACE_EXPORTER (none, file or otlp) and friends, as in tracing.py
+const tracerFromEnv = (service, logger = console) => {
+  const kind = process.env.TRACE_EXPORTER || 'none';
+  let sink = null;
+  if (kind === 'file') {
+    sink = new FileSpanSink(process.env.TRACE_FILE || `/tmp/traces/${service}.jsonl`);
+  } else if (kind === 'otlp') {
+    sink = new OTLPHttpSink(process.env.OTLP_ENDPOINT || 'http://otel-collector:4318');
+  } else if (kind !== 'none') {
+    throw new Error(`Unknown TRACE_EXPORTER: ${kind}`);
+  }
+  const exporter = sink && new BatchSpanExporter(sink, service, {
+    maxQueue: parseInt(process.env.TRACE_QUEUE_SIZE, 10) || 2048,
+    batchSize: parseInt(process.env.TRACE_BATCH_SIZE, 10) || 256,
+    intervalMs: (parseFloat(process.env.TRACE_EXPORT_INTERVAL) || 1) * 1000,
+    logger
+  });
+  const sampleRate = parseFloat(process.env.TRACE_SAMPLE_RATE || '1');
+  return new Tracer(service, exporter, sampleRate);
+};
+
+module.exports = { parseTraceparent, Span, FileSpanSink, OTLPHttpSink, BatchSpanExporter, Tracer, tracerFromEnv };
@@ -0,0 +1,110 @@
+const { EventEmitter } = require('events');
+const { parseTraceparent, BatchSpanExporter, Tracer } = require('./tracing');
+
+const INCOMING = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01';
+
+class MemorySink {
+  constructor() {
+    this.spans = [];
+  }
+
+  async write(service, spans) {
+    this.spans.push(...spans.map((span) => ({ ...span.toDict(), service })));
+  }
+}
+
+const handle = (tracer, headers = {}) => {
+  const req = { method: 'GET', path: '/api/orders/42/events', headers };
+  const res = new EventEmitter();
+  res.statusCode = 200;
+  res.writableFinished = true;
+  res.headers = {};
+  res.setHeader = (name, value) => { res.headers[name] = value; };
+  tracer.middleware()(req, res, () => {});
+  return { req, res };
+};
+
+describe('parseTraceparent', () => {
+  it('reads trace id, parent id and the sampled flag', () => {
+    expect(parseTraceparent(INCOMING)).toEqual(['0af7651916cd43dd8448eb211c80319c', 'b7ad6b7169203331', true]);
+  });
+
+  it.each([undefined, '', 'garbage', `ff${INCOMING.slice(2)}`, `00-${'0'.repeat(32)}-b7ad6b7169203331-01`])(
+    'rejects %p', (value) => {
+      expect(parseTraceparent(value)).toBeNull();
+    }
+  );
+});
+
+describe('Tracer middleware', () => {
+  let sink;
+  let exporter;
+  let tracer;
+
+  beforeEach(() => {
+    sink = new MemorySink();
+    exporter = new BatchSpanExporter(sink, 'api-gateway', { intervalMs: 60000 });
+    tracer = new Tracer('api-gateway', exporter);
+  });
+
+  afterEach(() => clearInterval(exporter.timer));
+
+  it('records a server span under the caller and forwards its own id', async () => {
+    const { req, res } = handle(tracer, { traceparent: INCOMING });
+    const forwarded = parseTraceparent(req.span.traceparent());
+    res.emit('finish');
+    res.emit('close');
+    await exporter.flush();
+
+    expect(res.headers['X-Trace-Id']).toBe('0af7651916cd43dd8448eb211c80319c');
+    expect(sink.spans).toHaveLength(1);
+    const [span] = sink.spans;
+    expect(span).toMatchObject({
+      trace_id: '0af7651916cd43dd8448eb211c80319c',
+      parent_id: 'b7ad6b7169203331',
+      name: 'GET /api/orders',
+      kind: 'server',
+      service: 'api-gateway',
+      error: false
+    });
+    expect(span.attributes['http.status_code']).toBe(200);
+    expect(forwarded).toEqual([span.trace_id, span.span_id, true]);
+  });
+
+  it('starts a new trace without a traceparent and marks 5xx as errors', async () => {
+    const { res } = handle(tracer);
+    res.statusCode = 502;
+    res.emit('finish');
+    await exporter.flush();
+
+    expect(sink.spans[0].parent_id).toBeNull();
+    expect(sink.spans[0].trace_id).toMatch(/^[0-9a-f]{32}$/);
+    expect(sink.spans[0].error).toBe(true);
+  });
+
+  it('leaves unsampled traces unexported', async () => {
+    const { req, res } = handle(tracer, { traceparent: INCOMING.replace(/01$/, '00') });
+    res.emit('finish');
+    await exporter.flush();
+
+    expect(req.span.traceparent()).toMatch(/-00$/);
+    expect(sink.spans).toEqual([]);
+  });
+});
+
+describe('BatchSpanExporter', () => {
+  it('drops spans past the queue limit and counts failed batches', async () => {
+    const sink = { write: jest.fn().mockRejectedValue(new Error('collector down')) };
+    const exporter = new BatchSpanExporter(sink, 'api-gateway', {
+      maxQueue: 2, intervalMs: 60000, logger: { warn: jest.fn() }
+    });
+    clearInterval(exporter.timer);
+
+    exporter.export({});
+    exporter.export({});
+    exporter.export({});
+    await exporter.flush();
+
+    expect(exporter.snapshot()).toEqual({ exported: 0, dropped: 3, failed_batches: 1, queued: 0 });
+  });
+});
@@ -0,0 +1,90 @@
+import functools
+import hashlib
+import json
+import time
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+class IdempotencyStore:
+    """Remembers responses to requests carrying an Idempotency-Key header.
+
+    The first request claims the key in Redis with SET NX and runs; its
+    response is stored for `ttl` seconds and replayed to any retry with the
+    same key. A duplicate that arrives while the first one is still running
+    waits for its result instead of doing the work again. Server errors
+    release the key so the client can retry for real.
+    """
+
+    def __init__(self, redis_client, ttl=86400, lock_ttl=60, wait_timeout=30, poll_interval=0.05,
+                 key_prefix='orders:idempotency:'):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.key_prefix = key_prefix
+
+    def __call__(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > 255:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'}), 400
+
+            redis_key = f"{self.key_prefix}{get_jwt_identity()}:{key}"
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+            claimed = self.redis.set(
+                redis_key,
+                json.dumps({'state': 'in_progress', 'fingerprint': fingerprint}),
+                nx=True,
+                ex=self.lock_ttl
+            )
+            if not claimed:
+                return self._replay(redis_key, fingerprint)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                self.redis.delete(redis_key)
+                raise
+
+            if response.status_code >= 500:
+                self.redis.delete(redis_key)
+            else:
+                self.redis.set(redis_key, json.dumps({
+                    'state': 'done',
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'body': response.get_data(as_text=True)
+                }), ex=self.ttl)
+            return response
+
+        return wrapper
+
+    def _replay(self, redis_key, fingerprint):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            stored = self.redis.get(redis_key)
+            if stored is None:
+                # The original failed and released the key
+                return jsonify({'error': 'Original request failed, please retry'}), 409
+
+            record = json.loads(stored)
+            if record['fingerprint'] != fingerprint:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'}), 422
+
+            if record['state'] == 'done':
+                response = current_app.response_class(record['body'], status=record['status'], mimetype='application/json')
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            if time.monotonic() >= deadline:
+                return jsonify({'error': 'A request with this key is still in progress'}), 409
+            time.sleep(self.poll_interval)
@@ -0,0 +1,99 @@
+"""Apply order-service schema migrations.
+
+Run once per deploy, before new app versions take traffic; the services
+themselves never create or alter tables. Migrations are append-only:
+add a new version for every schema change and raise
+REQUIRED_SCHEMA_VERSION in app.py once the code depends on it.
+
+Usage: python migrate.py [--status]
+"""
+import argparse
+import logging
+
+from app import create_app, db, REQUIRED_SCHEMA_VERSION
+from schema_migrations import MigrationRunner
+
+logging.basicConfig(level=logging.INFO)
+
+# Version 1 is the schema db.metadata.create_all() produced when migrations
+# were introduced, frozen here so later model edits cannot change it. IF NOT
+# EXISTS keeps it a no-op on databases whose tables predate migrations.
+MIGRATIONS = [
+    (1, 'baseline schema', [
+        """
+        CREATE TABLE IF NOT EXISTS order_outbox (
+            id BIGSERIAL NOT NULL,
+            event_type VARCHAR(50) NOT NULL,
+            payload JSON NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            available_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            failed_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_order_outbox_pending ON order_outbox (available_at, id) WHERE failed_at IS NULL",
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id SERIAL NOT NULL,
+            order_number VARCHAR(100) NOT NULL,
+            user_id INTEGER NOT NULL,
+            status VARCHAR(20),
+            total_amount NUMERIC(10, 2) NOT NULL,
+            payment_id VARCHAR(100),
+            shipping_address JSON,
+            billing_address JSON,
+            notes TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            shipped_at TIMESTAMP WITHOUT TIME ZONE,
+            delivered_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id),
+            UNIQUE (order_number)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_orders_user_id_created_at_id ON orders (user_id, created_at DESC, id DESC)",
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id SERIAL NOT NULL,
+            order_id INTEGER NOT NULL,
+            order_created_at TIMESTAMP WITHOUT TIME ZONE,
+            product_id INTEGER NOT NULL,
+            product_name VARCHAR(255) NOT NULL,
+            price NUMERIC(10, 2) NOT NULL,
+            quantity INTEGER NOT NULL,
+            product_image_url VARCHAR(500),
+            PRIMARY KEY (id),
+            FOREIGN KEY (order_id) REFERENCES orders (id)
+        )
+        """
+    ]),
+    (2, 'order history index and order item partition key', [
+        "UPDATE orders SET created_at = COALESCE(updated_at, localtimestamp) WHERE created_at IS NULL",
+        "ALTER TABLE orders ALTER COLUMN created_at SET NOT NULL",
+        "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS order_created_at timestamp",
+        "CREATE INDEX IF NOT EXISTS ix_orders_user_id_created_at_id ON orders (user_id, created_at DESC, id DESC)"
+    ])
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply order-service schema migrations')
+    parser.add_argument('--status', action='store_true', help='show the schema version and exit')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        runner = MigrationRunner(db.engine, MIGRATIONS)
+        if runner.latest < REQUIRED_SCHEMA_VERSION:
+            raise SystemExit(f"app.py requires schema {REQUIRED_SCHEMA_VERSION} but the newest migration is {runner.latest}")
+        if args.status:
+            print(f"Schema version {runner.current()} (latest {runner.latest}, required {REQUIRED_SCHEMA_VERSION})")
+            return
+        applied = runner.run()
+
+    print(f"Applied migrations {applied}" if applied else 'Schema is up to date')
+
+
+if __name__ == '__main__':
+    main()
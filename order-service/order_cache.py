@@ -0,0 +1,101 @@
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Left in place of an invalidated entry; never valid order JSON
+TOMBSTONE = '-'
+
+
+class OrderCache:
+    """Read-through Redis cache of serialized orders keyed by order number and owner.
+
+    Entries hold the response JSON itself, so a hit skips both the queries
+    and serialization. Readers only fill missing entries (SET NX), while
+    writers overwrite with the committed state after each transition, so a
+    slow reader cannot replace a writer's fresher copy. Invalidation leaves
+    a short-lived tombstone rather than deleting the key, so a reader that
+    loaded the order before the invalidation cannot fill the old state back
+    in; tombstone_ttl must outlast a loader call. The TTL bounds staleness
+    if an invalidation is lost. Redis errors degrade to a miss.
+    """
+
+    def __init__(self, redis_client, ttl=300, tombstone_ttl=10, key_prefix='orders:cache:', dumps=json.dumps):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self.key_prefix = key_prefix
+        self.dumps = dumps
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'invalidations': 0, 'errors': 0}
+
+    def key(self, order_number, user_id):
+        return f"{self.key_prefix}{order_number}:{int(user_id)}"
+
+    def get(self, order_number, user_id, loader):
+        """Return the order's JSON text, calling loader() on a miss.
+
+        loader returns the serialized order dict or None if it does not exist.
+        It must read from the primary, since what it returns is cached.
+        """
+        key = self.key(order_number, user_id)
+        try:
+            cached = self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Order cache read failed: {e}")
+            self._count('errors')
+            cached = None
+        if cached is not None and cached != TOMBSTONE:
+            self._count('hits')
+            return cached
+
+        self._count('misses')
+        order = loader()
+        if order is None:
+            return None
+        payload = self.dumps(order)
+        if cached == TOMBSTONE:
+            # Recently invalidated: serve the fresh read, leave the fill to later readers
+            return payload
+        try:
+            self.redis.set(key, payload, ex=self.ttl, nx=True)
+        except Exception as e:
+            logger.warning(f"Order cache write failed: {e}")
+            self._count('errors')
+        return payload
+
+    def refresh(self, order_number, user_id, order):
+        """Store the committed state of an order after a change"""
+        try:
+            self.redis.set(self.key(order_number, user_id), self.dumps(order), ex=self.ttl)
+            self._count('refreshes')
+        except Exception as e:
+            logger.warning(f"Order cache refresh failed for {order_number}: {e}")
+            self._count('errors')
+
+    def invalidate(self, orders):
+        """Replace cached copies of (order_number, user_id) pairs with tombstones"""
+        keys = [self.key(order_number, user_id) for order_number, user_id in orders]
+        if not keys:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for key in keys:
+                pipe.set(key, TOMBSTONE, ex=self.tombstone_ttl)
+            pipe.execute()
+            self._count('invalidations', len(keys))
+        except Exception as e:
+            logger.warning(f"Order cache invalidation failed for {len(keys)} orders: {e}")
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def stream_id_key(event_id):
+    """Sort key for Redis stream ids ('<ms>-<seq>')"""
+    ms, _, seq = event_id.partition('-')
+    return int(ms), int(seq or 0)
+
+
+class OrderEventHub:
+    """Fans order status changes out to server-sent event subscribers.
+
+    Each change is appended to a short per-order Redis stream (for
+    Last-Event-ID resume) and published on one shared channel. Every
+    process holds a single pub/sub connection and hands events to local
+    subscriber queues, so idle subscribers cost a queue each rather than
+    a Redis connection each.
+    """
+
+    def __init__(self, redis_client, channel='orders:status', stream_prefix='orders:events:',
+                 stream_maxlen=100, stream_ttl=7 * 86400, token_prefix='orders:stream-token:', token_ttl=60):
+        self.redis = redis_client
+        self.channel = channel
+        self.stream_prefix = stream_prefix
+        self.stream_maxlen = stream_maxlen
+        self.stream_ttl = stream_ttl
+        self.token_prefix = token_prefix
+        self.token_ttl = token_ttl
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._listening = threading.Event()
+
+    def publish(self, order_number, status, **data):
+        """Record and broadcast a status change; call after the change is committed"""
+        payload = dict(data, order_number=order_number, status=status)
+        stream_key = f"{self.stream_prefix}{order_number}"
+        try:
+            event_id = self.redis.xadd(stream_key, {'data': json.dumps(payload)},
+                                       maxlen=self.stream_maxlen, approximate=True)
+            pipe = self.redis.pipeline()
+            pipe.expire(stream_key, self.stream_ttl)
+            pipe.publish(self.channel, json.dumps({'id': event_id, 'data': payload}))
+            pipe.execute()
+        except Exception as e:
+            # Subscribers still see the new status on their next reconnect
+            logger.warning(f"Failed to publish status change for {order_number}: {e}")
+
+    def publish_many(self, changes):
+        """Record and broadcast many (order_number, status, data) changes in two round trips"""
+        if not changes:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for order_number, status, data in changes:
+                pipe.xadd(f"{self.stream_prefix}{order_number}",
+                          {'data': json.dumps(dict(data, order_number=order_number, status=status))},
+                          maxlen=self.stream_maxlen, approximate=True)
+            event_ids = pipe.execute()
+
+            pipe = self.redis.pipeline()
+            for event_id, (order_number, status, data) in zip(event_ids, changes):
+                pipe.expire(f"{self.stream_prefix}{order_number}", self.stream_ttl)
+                pipe.publish(self.channel, json.dumps({
+                    'id': event_id,
+                    'data': dict(data, order_number=order_number, status=status)
+                }))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish {len(changes)} status changes: {e}")
+
+    def events_since(self, order_number, last_event_id):
+        """Events recorded after last_event_id, oldest first"""
+        entries = self.redis.xrange(f"{self.stream_prefix}{order_number}", min=f"({last_event_id}", max='+')
+        return [(event_id, json.loads(fields['data'])) for event_id, fields in entries]
+
+    def latest_event_id(self, order_number):
+        entries = self.redis.xrevrange(f"{self.stream_prefix}{order_number}", count=1)
+        return entries[0][0] if entries else None
+
+    def issue_stream_token(self, user_id, order_number):
+        """Short-lived credential for one user's stream of one order.
+
+        Browsers' EventSource cannot send an Authorization header, so pages
+        trade their access token for one of these and pass it in the query
+        string. It stays valid for token_ttl seconds, long enough for
+        EventSource's own reconnects but not worth much if it leaks into a log.
+        """
+        token = secrets.token_urlsafe(24)
+        self.redis.set(f"{self.token_prefix}{token}", json.dumps([user_id, order_number]), ex=self.token_ttl)
+        return token
+
+    def stream_token_user(self, token, order_number):
+        """The user id a stream token was issued to, or None if it is unknown, expired or for another order"""
+        value = self.redis.get(f"{self.token_prefix}{token}")
+        if value is None:
+            return None
+        user_id, token_order_number = json.loads(value)
+        return user_id if token_order_number == order_number else None
+
+    def subscribe(self, order_number, timeout=5):
+        """Queue receiving the order's events published from now on.
+
+        Waits (up to timeout) for this process's Redis subscription, so the
+        caller can read current state afterwards without missing a change.
+        """
+        self._ensure_listener()
+        subscriber = queue.Queue(maxsize=100)
+        with self._lock:
+            self._subscribers.setdefault(order_number, set()).add(subscriber)
+        if not self._listening.wait(timeout):
+            logger.warning('Order event listener is not subscribed yet; events may be missed')
+        return subscriber
+
+    def unsubscribe(self, order_number, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(order_number)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[order_number]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _dispatch(self, message):
+        event = json.loads(message)
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['data']['order_number'], ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event['id'], event['data']))
+            except queue.Full:
+                # A stalled client; it will resume from Last-Event-ID when it reconnects
+                pass
+
+    def _ensure_listener(self):
+        # One listener thread per process, started lazily so it survives forking servers
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            # A forked child inherits the parent's flag but not its listener
+            self._listening = threading.Event()
+        threading.Thread(target=self._listen, name='order-events', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if message.get('type') == 'subscribe':
+                        self._listening.set()
+                    elif message.get('type') == 'message':
+                        self._dispatch(message['data'])
+            except Exception as e:
+                self._listening.clear()
+                logger.warning(f"Order event listener error: {e}")
+                time.sleep(1)
@@ -0,0 +1,213 @@
+import atexit
+import logging
+import os
+import re
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# 2024-01-01T00:00:00Z; 41 bits of milliseconds from here last until 2093
+EPOCH_MS = 1704067200000
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Crockford base32 digits are in ascending ASCII order, so fixed-width
+# encodings sort the same way as the integers they encode
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ENCODED_LENGTH = 13
+
+ORDER_NUMBER_PATTERN = re.compile(r'^ORD-([0-9A-HJKMNP-TV-Z]{13})$')
+LEGACY_ORDER_NUMBER_PATTERN = re.compile(r'^ORD-(\d{8})-[0-9A-F]{8}$')
+
+
+# Extends a node lease only while this process still holds it
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class NodeIdUnavailable(Exception):
+    """Raised when no order id node can be leased; ids are not generated without one"""
+
+
+def encode_base32(value):
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD[digit])
+    return ''.join(reversed(chars))
+
+
+def decode_base32(text):
+    value = 0
+    for char in text:
+        value = value * 32 + CROCKFORD.index(char)
+    return value
+
+
+def order_number_timestamp(order_number):
+    """Approximate UTC creation time encoded in an order number, or None.
+
+    Covers both the current format and legacy ORD-YYYYMMDD-XXXXXXXX
+    numbers (whose time is the start of their day).
+    """
+    match = ORDER_NUMBER_PATTERN.match(order_number)
+    if match:
+        ms = (decode_base32(match.group(1)) >> (NODE_BITS + SEQUENCE_BITS)) + EPOCH_MS
+        return datetime(1970, 1, 1) + timedelta(milliseconds=ms)
+    match = LEGACY_ORDER_NUMBER_PATTERN.match(order_number)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), '%Y%m%d')
+        except ValueError:
+            return None
+    return None
+
+
+class OrderIdGenerator:
+    """Snowflake-style order numbers: 41 bits of time, 10 of node, 12 of sequence.
+
+    Ids from one process are strictly increasing and ids from different
+    nodes never collide, so no database round trip or unique-violation
+    retry is needed. Numbers render as `ORD-` plus 13 Crockford base32
+    characters; because they sort by creation time, new rows always land
+    on the right-most page of the order_number index.
+
+    The node id comes from ORDER_NODE_ID when set. Otherwise each process
+    leases a free one in Redis (SET NX with a lease_ttl expiry) the first
+    time it generates an id, renews it from a heartbeat thread and releases
+    it on exit, so recycled workers hand their ids back instead of using up
+    the 1024 available. Generation fails closed with NodeIdUnavailable when
+    no node is free, Redis is unreachable, or the lease could not be renewed
+    before it would have expired, since another process may then hold it.
+    """
+
+    def __init__(self, redis_client=None, node_id=None, prefix='ORD-', node_key='orders:id-node',
+                 lease_ttl=30):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.node_key = node_key
+        self.lease_ttl = lease_ttl
+        self._configured_node = node_id
+        self._node_id = None
+        self._node_pid = None
+        self._lease_owner = None
+        self._lease_valid_until = 0.0
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._lease_lock = threading.Lock()
+
+    @property
+    def node_id(self):
+        # Leased per process so forked workers do not share a node id
+        if self._configured_node is not None:
+            return int(self._configured_node) & MAX_NODE
+        if self._node_pid == os.getpid() and time.monotonic() < self._lease_valid_until:
+            return self._node_id
+        with self._lease_lock:
+            if self._node_pid != os.getpid():
+                self._node_id = self._lease_node_id()
+                self._node_pid = os.getpid()
+                with self._lock:
+                    self._last_ms = -1
+                threading.Thread(target=self._heartbeat, name='order-id-lease', daemon=True).start()
+                atexit.register(self._release)
+            elif time.monotonic() >= self._lease_valid_until and not self._renew():
+                # The lease may have lapsed and been taken; start over with a fresh one
+                self._node_id = self._lease_node_id()
+        return self._node_id
+
+    def next_id(self):
+        node_id = self.node_id
+        with self._lock:
+            now_ms = int(time.time() * 1000) - EPOCH_MS
+            if now_ms < self._last_ms:
+                # Clock stepped backwards; keep counting from the last timestamp
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 4096 ids in one millisecond; move on to the next one
+                    now_ms = self._wait_past(self._last_ms)
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            return (now_ms << (NODE_BITS + SEQUENCE_BITS)) | (node_id << SEQUENCE_BITS) | self._sequence
+
+    def next_order_number(self):
+        return f"{self.prefix}{encode_base32(self.next_id())}"
+
+    def _wait_past(self, last_ms):
+        now_ms = int(time.time() * 1000) - EPOCH_MS
+        while now_ms <= last_ms:
+            time.sleep(0.0001)
+            now_ms = int(time.time() * 1000) - EPOCH_MS
+        return now_ms
+
+    def _lease_node_id(self):
+        """Lease a free node id, probing from a random one; raises NodeIdUnavailable"""
+        if self.redis is None:
+            raise NodeIdUnavailable('ORDER_NODE_ID is not set and there is no Redis to lease a node id from')
+        owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        start = secrets.randbelow(MAX_NODE + 1)
+        try:
+            for offset in range(MAX_NODE + 1):
+                node_id = (start + offset) & MAX_NODE
+                # Counted from before the SET, so the local view never outlives Redis's
+                valid_until = time.monotonic() + self.lease_ttl * 2 / 3
+                if self.redis.set(f"{self.node_key}:{node_id}", owner, nx=True, ex=self.lease_ttl):
+                    self._lease_owner = owner
+                    self._lease_valid_until = valid_until
+                    logger.info(f"Leased order id node {node_id}")
+                    return node_id
+        except Exception as e:
+            raise NodeIdUnavailable(f"Could not lease an order id node: {e}") from e
+        raise NodeIdUnavailable(f"All {MAX_NODE + 1} order id nodes are leased")
+
+    def _renew(self):
+        valid_until = time.monotonic() + self.lease_ttl * 2 / 3
+        try:
+            renewed = self.redis.eval(
+                RENEW_LEASE_SCRIPT, 1, f"{self.node_key}:{self._node_id}", self._lease_owner, self.lease_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Could not renew order id node {self._node_id}: {e}")
+            return False
+        if not renewed:
+            logger.warning(f"Lost the lease on order id node {self._node_id}")
+            return False
+        self._lease_valid_until = valid_until
+        return True
+
+    def _heartbeat(self):
+        pid = os.getpid()
+        while self._node_pid == pid:
+            time.sleep(self.lease_ttl / 3)
+            with self._lease_lock:
+                if self._node_pid == pid and not self._renew():
+                    # Fail closed until node_id leases a new one
+                    self._lease_valid_until = 0.0
+
+    def _release(self):
+        if self._node_pid != os.getpid():
+            return
+        try:
+            self.redis.eval(RELEASE_LEASE_SCRIPT, 1, f"{self.node_key}:{self._node_id}", self._lease_owner)
+        except Exception as e:
+            logger.warning(f"Could not release order id node {self._node_id}: {e}")
@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BACKLOG_SQL = (
+    "SELECT count(*) FILTER (WHERE failed_at IS NULL), "
+    "EXTRACT(EPOCH FROM localtimestamp - min(created_at) FILTER (WHERE failed_at IS NULL)), "
+    "count(*) FILTER (WHERE failed_at IS NOT NULL) "
+    "FROM order_outbox"
+)
+
+
+class OutboxMetrics:
+    """Outbox delivery metrics, kept by the workers and read by /metrics.
+
+    Each worker counts what it delivers, retries and parks, and how long
+    events waited between being written and being delivered. Every
+    interval it publishes those counters to Redis together with the
+    backlog (pending and parked events, age of the oldest pending one),
+    measured once by that worker rather than on every metrics scrape.
+    Workers that stop publishing drop out of the snapshot after three
+    intervals, and so does the backlog once no worker is left.
+    """
+
+    def __init__(self, redis_client, interval=10, key_prefix='orders:outbox:', worker=None):
+        self.redis = redis_client
+        self.interval = interval
+        self.key_prefix = key_prefix
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._published_at = 0.0
+        self._stats = {'handled': 0, 'retried': 0, 'parked': 0, 'delivery_ms_total': 0.0, 'delivery_ms_max': 0.0}
+        self._lag = []
+
+    def record(self, outcome, lag_seconds, delivery_ms):
+        """Count one delivery attempt; outcome is handled, retried or parked"""
+        with self._lock:
+            self._stats[outcome] += 1
+            self._stats['delivery_ms_total'] += delivery_ms
+            self._stats['delivery_ms_max'] = max(self._stats['delivery_ms_max'], delivery_ms)
+            self._lag.append(lag_seconds)
+
+    def due(self):
+        return time.monotonic() - self._published_at >= self.interval
+
+    def publish(self, backlog):
+        """Store this worker's counters and the measured (pending, oldest_seconds, failed) backlog"""
+        pending, oldest_seconds, failed = backlog
+        with self._lock:
+            stats = dict(self._stats)
+            lag, self._lag = self._lag, []
+        attempts = stats['handled'] + stats['retried'] + stats['parked']
+        worker = {
+            'handled': stats['handled'],
+            'retried': stats['retried'],
+            'parked': stats['parked'],
+            'avg_delivery_ms': round(stats['delivery_ms_total'] / attempts, 2) if attempts else 0.0,
+            'max_delivery_ms': round(stats['delivery_ms_max'], 2),
+            # Written-to-delivered delay of the events delivered this interval
+            'lag_seconds': {
+                'last': round(lag[-1], 3) if lag else None,
+                'max': round(max(lag), 3) if lag else None
+            },
+            'updated_at': time.time()
+        }
+        pipe = self.redis.pipeline()
+        pipe.hset(f"{self.key_prefix}workers", self.worker, json.dumps(worker))
+        pipe.set(f"{self.key_prefix}backlog", json.dumps({
+            'pending': pending,
+            'failed': failed,
+            'lag_seconds': round(float(oldest_seconds), 3) if oldest_seconds is not None else 0.0,
+            'measured_at': time.time()
+        }), ex=int(self.interval * 3))
+        pipe.execute()
+        self._published_at = time.monotonic()
+
+    def snapshot(self):
+        """Backlog and live workers' counters as last published"""
+        backlog, workers = self.redis.get(f"{self.key_prefix}backlog"), self.redis.hgetall(f"{self.key_prefix}workers")
+        live, stale = {}, []
+        for name, value in workers.items():
+            stats = json.loads(value)
+            if time.time() - stats['updated_at'] > self.interval * 3:
+                stale.append(name)
+            else:
+                live[name] = stats
+        if stale:
+            self.redis.hdel(f"{self.key_prefix}workers", *stale)
+        return dict(json.loads(backlog) if backlog else {'pending': None, 'failed': None, 'lag_seconds': None},
+                    workers=live)
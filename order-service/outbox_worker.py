@@ -0,0 +1,155 @@
+"""Drain the order outbox and run side effects outside the request path.
+
+Each pass claims a batch of due events with FOR UPDATE SKIP LOCKED, so any
+number of workers can run side by side without handing out the same event
+twice. The claim moves the events' available_at OUTBOX_CLAIM_SECONDS ahead
+and commits, so no row lock is held while the side effects make HTTP
+calls; if the worker dies, the events come due again once the claim runs
+out. Each event is then settled in its own short transaction: handled
+events are deleted, failures back off exponentially and are parked with
+failed_at after OUTBOX_MAX_ATTEMPTS. A worker whose claim ran out leaves
+the row alone.
+
+Delivery counters, delivery lag and the backlog are published to Redis
+every OUTBOX_METRICS_INTERVAL seconds for order-service's /metrics.
+
+Usage: python outbox_worker.py
+"""
+import logging
+import os
+import time
+from datetime import timedelta
+
+from app import create_app, db, redis_client, service_token, OutboxEvent, clear_cart
+from outbox_metrics import BACKLOG_SQL, OutboxMetrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('outbox_worker')
+
+BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 0.5))
+MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+MAX_BACKOFF = int(os.getenv('OUTBOX_MAX_BACKOFF', 300))
+# Longer than any handler can take, upstream timeouts included
+CLAIM_SECONDS = int(os.getenv('OUTBOX_CLAIM_SECONDS', 60))
+
+metrics = OutboxMetrics(redis_client, interval=float(os.getenv('OUTBOX_METRICS_INTERVAL', 10)))
+
+CLAIM_SQL = """
+UPDATE order_outbox o SET available_at = localtimestamp + make_interval(secs => :claim_seconds)
+FROM (
+    SELECT id FROM order_outbox
+    WHERE failed_at IS NULL AND available_at <= localtimestamp
+    ORDER BY available_at, id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+) due
+WHERE o.id = due.id
+RETURNING o.id, o.event_type, o.payload, o.attempts, o.created_at, o.available_at AS claimed_until,
+    localtimestamp AS claimed_at
+"""
+
+
+def handle_cart_clear(payload):
+    # cart-service honours X-User-ID only alongside a service-role token
+    if not clear_cart(payload['user_id'], service_token.headers(payload['user_id'])):
+        raise RuntimeError('cart-service did not clear the cart')
+
+
+HANDLERS = {
+    'cart.clear': handle_cart_clear
+}
+
+
+def claim_batch():
+    """Claim a batch of due events and commit, releasing their row locks"""
+    events = db.session.execute(db.text(CLAIM_SQL), {'claim_seconds': CLAIM_SECONDS, 'limit': BATCH_SIZE}).all()
+    db.session.commit()
+    return sorted(events, key=lambda event: event.id)
+
+
+def settle(event, **values):
+    """Apply values to a claimed event (or delete it when values is empty); False if the claim ran out"""
+    claimed = db.and_(OutboxEvent.id == event.id, OutboxEvent.available_at == event.claimed_until)
+    if values:
+        statement = db.update(OutboxEvent).where(claimed).values(**values)
+    else:
+        statement = db.delete(OutboxEvent).where(claimed)
+    settled = db.session.execute(statement).rowcount == 1
+    db.session.commit()
+    if not settled:
+        logger.warning(f"Claim on {event.event_type} #{event.id} ran out before it was settled")
+    return settled
+
+
+def deliver(event):
+    started = time.perf_counter()
+    lag_seconds = (event.claimed_at - event.created_at).total_seconds()
+    try:
+        handler = HANDLERS.get(event.event_type)
+        if handler is None:
+            raise RuntimeError(f"No handler for event type {event.event_type}")
+        handler(event.payload)
+    except Exception as e:
+        attempts = event.attempts + 1
+        delivery_ms = (time.perf_counter() - started) * 1000
+        if attempts >= MAX_ATTEMPTS:
+            settle(event, attempts=attempts, last_error=str(e)[:1000], failed_at=db.func.localtimestamp())
+            metrics.record('parked', lag_seconds, delivery_ms)
+            logger.error(f"Giving up on {event.event_type} #{event.id} after {attempts} attempts: {e}")
+        else:
+            backoff = min(MAX_BACKOFF, 2 ** attempts)
+            settle(event, attempts=attempts, last_error=str(e)[:1000],
+                   available_at=db.func.localtimestamp() + timedelta(seconds=backoff))
+            metrics.record('retried', lag_seconds, delivery_ms)
+            logger.warning(f"{event.event_type} #{event.id} failed, retrying in {backoff}s: {e}")
+        return
+
+    delivery_ms = (time.perf_counter() - started) * 1000
+    settle(event)
+    metrics.record('handled', lag_seconds, delivery_ms)
+    logger.info(f"Handled {event.event_type} #{event.id} in {delivery_ms:.0f}ms (lag {lag_seconds:.2f}s)")
+
+
+def process_batch():
+    """Handle one batch of due events; returns how many were claimed"""
+    events = claim_batch()
+    for event in events:
+        try:
+            deliver(event)
+        except Exception as e:
+            # Settling failed; the event comes due again when its claim runs out
+            db.session.rollback()
+            logger.exception(f"Could not settle {event.event_type} #{event.id}: {e}")
+    return len(events)
+
+
+def publish_metrics():
+    try:
+        backlog = db.session.execute(db.text(BACKLOG_SQL)).one()
+        db.session.rollback()
+        metrics.publish(backlog)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not publish outbox metrics: {e}")
+
+
+def main():
+    logger.info(f"Outbox worker started (batch size {BATCH_SIZE})")
+    with create_app().app_context():
+        while True:
+            try:
+                claimed = process_batch()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"Outbox pass failed: {e}")
+                claimed = 0
+            if metrics.due():
+                publish_metrics()
+            # Keep draining while there is a backlog; idle-poll otherwise
+            if claimed < BATCH_SIZE:
+                time.sleep(POLL_INTERVAL)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""Monthly range partitioning of orders and order_items, plus archival of closed orders.
+
+`setup` converts the existing tables once. Each table is renamed to
+*_legacy and re-created as a table partitioned by RANGE on created_at
+(order_created_at for items). Rows from the current month on are moved
+into monthly partitions, and the legacy table, with its old primary key
+dropped, is attached as the partition holding everything before the
+current month. A DEFAULT partition catches rows beyond the monthly ones.
+That runs under an exclusive lock, copies the current month's rows and
+builds the composite key indexes on the legacy table, so run it in a
+maintenance window. Afterwards set ORDERS_PARTITIONED=true on
+order-service.
+
+Postgres can only enforce unique keys on a partitioned table when they
+include the partition key. After setup the database therefore enforces
+(order_number, created_at), not order_number alone: two orders with the
+same number and different created_at are no longer rejected. New numbers
+are unique by construction (order_ids.py); the unique order_number
+constraint on the old table is dropped with it.
+
+`maintain` creates the monthly partitions ORDER_PARTITION_MONTHS_AHEAD
+ahead of time. It moves delivered and cancelled orders older than
+ORDER_RETENTION_DAYS into yearly orders_archive / order_items_archive
+partitions, in batches. Those partitions store their JSON and text
+columns compressed with ORDER_ARCHIVE_COMPRESSION (lz4 unless the server
+lacks it) and are packed with fillfactor 100. Live
+partitions left empty by archival are detached and dropped. `run` repeats
+maintain every ORDER_PARTITION_INTERVAL seconds.
+
+Usage: python partitioning.py {setup,maintain,run} [--batch-size 1000]
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from datetime import date, timedelta
+
+from app import create_app, db, TERMINAL_STATUSES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('partitioning')
+
+MONTHS_AHEAD = int(os.getenv('ORDER_PARTITION_MONTHS_AHEAD', 3))
+RETENTION_DAYS = int(os.getenv('ORDER_RETENTION_DAYS', 365))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', 1000))
+INTERVAL = int(os.getenv('ORDER_PARTITION_INTERVAL', 3600))
+# Maintenance DDL gives up rather than queueing live traffic behind its locks
+LOCK_TIMEOUT = os.getenv('ORDER_PARTITION_LOCK_TIMEOUT', '5s')
+
+# (parent table, partition key) for live and archive tables
+LIVE_TABLES = (('orders', 'created_at'), ('order_items', 'order_created_at'))
+ARCHIVE_TABLES = (('orders_archive', 'created_at'), ('order_items_archive', 'order_created_at'))
+ARCHIVE_COMPRESSION = os.getenv('ORDER_ARCHIVE_COMPRESSION', 'lz4')
+ARCHIVE_COMPRESSED_COLUMNS = {
+    'orders_archive': ('shipping_address', 'billing_address', 'notes'),
+    'order_items_archive': ('product_name', 'product_image_url')
+}
+
+MONTHLY_PARTITION = re.compile(r'^orders_p(\d{4})(\d{2})$')
+
+# Run one statement at a time by setup(), before the current month's rows
+# move and the legacy tables are attached
+SETUP_SQL = [
+    "UPDATE orders SET created_at = COALESCE(updated_at, localtimestamp) WHERE created_at IS NULL",
+    "ALTER TABLE orders ALTER COLUMN created_at SET NOT NULL",
+
+    "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS order_created_at timestamp",
+    "UPDATE order_items i SET order_created_at = o.created_at "
+    "FROM orders o WHERE o.id = i.order_id AND i.order_created_at IS NULL",
+    "ALTER TABLE order_items ALTER COLUMN order_created_at SET NOT NULL",
+    "ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_order_id_fkey",
+
+    # A partition may not keep a primary key of its own; the parents' keys
+    # (which include the partition key) are built on the legacy tables on attach
+    "ALTER TABLE orders RENAME TO orders_legacy",
+    "ALTER TABLE orders_legacy DROP CONSTRAINT orders_pkey",
+    "ALTER TABLE orders_legacy DROP CONSTRAINT orders_order_number_key",
+    "ALTER INDEX IF EXISTS ix_orders_user_id_created_at_id RENAME TO ix_orders_legacy_user_id_created_at_id",
+    "ALTER TABLE order_items RENAME TO order_items_legacy",
+    "ALTER TABLE order_items_legacy DROP CONSTRAINT order_items_pkey",
+
+    # Unique keys must include the partition key, so order_number is only
+    # unique together with created_at from here on (see the module docstring)
+    "CREATE TABLE orders ("
+    "LIKE orders_legacy INCLUDING DEFAULTS, "
+    "PRIMARY KEY (id, created_at), "
+    "UNIQUE (order_number, created_at)"
+    ") PARTITION BY RANGE (created_at)",
+    "CREATE TABLE order_items ("
+    "LIKE order_items_legacy INCLUDING DEFAULTS, "
+    "PRIMARY KEY (id, order_created_at)"
+    ") PARTITION BY RANGE (order_created_at)",
+
+    # The partitioned tables own the id sequences from now on, so dropping
+    # the legacy partitions later leaves them in place
+    "ALTER SEQUENCE orders_id_seq OWNED BY orders.id",
+    "ALTER SEQUENCE order_items_id_seq OWNED BY order_items.id",
+
+    # Catch rows outside every monthly partition (far-future timestamps)
+    # instead of failing the insert; maintain() warns while they hold rows
+    "CREATE TABLE orders_default PARTITION OF orders DEFAULT",
+    "CREATE TABLE order_items_default PARTITION OF order_items DEFAULT"
+]
+
+# Run by setup() once the legacy tables are attached
+SETUP_INDEX_SQL = [
+    "CREATE INDEX ix_orders_user_id_created_at_id ON orders (user_id, created_at DESC, id DESC)",
+    "CREATE INDEX ix_orders_closed_created_at ON orders (created_at) WHERE status IN ('delivered', 'cancelled')",
+    "CREATE INDEX ix_order_items_order_id ON order_items (order_id, order_created_at)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_order_fkey "
+    "FOREIGN KEY (order_id, order_created_at) REFERENCES orders (id, created_at)",
+
+    "CREATE TABLE orders_archive (LIKE orders) PARTITION BY RANGE (created_at)",
+    "CREATE TABLE order_items_archive (LIKE order_items) PARTITION BY RANGE (order_created_at)",
+    "CREATE INDEX ix_orders_archive_order_number ON orders_archive (order_number)",
+    "CREATE INDEX ix_orders_archive_user_id_created_at ON orders_archive (user_id, created_at DESC)",
+    "CREATE INDEX ix_order_items_archive_order_id ON order_items_archive (order_id, order_created_at)"
+]
+
+# Moves one claimed batch of orders and their items in a single statement
+ARCHIVE_SQL = """
+WITH picked AS (
+    SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:created AS timestamp[])) AS p(id, created_at)
+), moved_items AS (
+    DELETE FROM order_items i USING picked p
+    WHERE i.order_id = p.id AND i.order_created_at = p.created_at
+    RETURNING i.*
+), archived_items AS (
+    INSERT INTO order_items_archive SELECT * FROM moved_items
+), moved_orders AS (
+    DELETE FROM orders o USING picked p
+    WHERE o.id = p.id AND o.created_at = p.created_at
+    RETURNING o.*
+)
+INSERT INTO orders_archive SELECT * FROM moved_orders
+"""
+
+
+def add_months(month, months):
+    index = month.month - 1 + months
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+
+def current_month():
+    return db.session.scalar(db.text("SELECT date_trunc('month', localtimestamp)::date"))
+
+
+def is_partitioned(table):
+    return db.session.scalar(
+        db.text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {'table': table}
+    )
+
+
+def set_lock_timeout():
+    db.session.execute(db.text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+
+
+def setup():
+    if is_partitioned('orders'):
+        logger.info('orders is already partitioned')
+        return
+    set_lock_timeout()
+    db.session.execute(db.text('LOCK TABLE orders, order_items IN ACCESS EXCLUSIVE MODE'))
+    boundary = current_month()
+    for statement in SETUP_SQL:
+        db.session.execute(db.text(statement))
+
+    # Rows from the boundary on go to the monthly partitions (or, past
+    # MONTHS_AHEAD, to the DEFAULT ones) so the legacy tables only keep
+    # what lies before it
+    create_partitions(boundary, add_months(boundary, MONTHS_AHEAD))
+    moved = {}
+    for parent, key in LIVE_TABLES:
+        legacy = f"{parent}_legacy"
+        moved[parent] = db.session.execute(
+            db.text(f"INSERT INTO {parent} SELECT * FROM {legacy} WHERE {key} >= :boundary"),
+            {'boundary': boundary}
+        ).rowcount
+        db.session.execute(db.text(f"DELETE FROM {legacy} WHERE {key} >= :boundary"), {'boundary': boundary})
+        db.session.execute(db.text(
+            f"ALTER TABLE {parent} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary}')"
+        ))
+
+    for statement in SETUP_INDEX_SQL:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+    logger.info(
+        f"Partitioned orders and order_items; rows before {boundary} are in the *_legacy partitions, "
+        f"{moved['orders']} newer orders moved to the new partitions"
+    )
+
+
+def create_partitions(first_month, last_month):
+    """Create the monthly live partitions from first_month through last_month, if missing"""
+    month = first_month
+    while month <= last_month:
+        for parent, _ in LIVE_TABLES:
+            db.session.execute(db.text(
+                f"CREATE TABLE IF NOT EXISTS {parent}_p{month:%Y%m} PARTITION OF {parent} "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            ))
+        month = add_months(month, 1)
+
+
+def ensure_partitions(months_ahead=MONTHS_AHEAD):
+    """Create monthly live partitions from the current month to months_ahead out"""
+    start = current_month()
+    set_lock_timeout()
+    create_partitions(start, add_months(start, months_ahead))
+    db.session.commit()
+
+
+def check_default_partitions():
+    """Warn about rows in the DEFAULT partitions.
+
+    They hold rows no monthly partition covered when they were written.
+    Creating a monthly partition for such a row's month fails until it is
+    moved, so they need a look.
+    """
+    for parent, key in LIVE_TABLES:
+        outside = db.session.execute(db.text(
+            f"SELECT count(*) AS row_count, min({key}) AS first_at, max({key}) AS last_at FROM {parent}_default"
+        )).one()
+        if outside.row_count:
+            logger.warning(
+                f"{parent}_default holds {outside.row_count} rows from {outside.first_at} to {outside.last_at}; "
+                "move them before their months' partitions are created"
+            )
+    db.session.rollback()
+
+
+def ensure_archive_partitions(years):
+    for year in sorted(years):
+        for parent, _ in ARCHIVE_TABLES:
+            name = f"{parent}_y{year}"
+            if db.session.scalar(db.text('SELECT to_regclass(:name)'), {'name': name}) is not None:
+                continue
+            db.session.execute(db.text(
+                f"CREATE TABLE {name} PARTITION OF {parent} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01') WITH (fillfactor = 100)"
+            ))
+            for column in ARCHIVE_COMPRESSED_COLUMNS[parent]:
+                db.session.execute(db.text(f"ALTER TABLE {name} ALTER COLUMN {column} SET COMPRESSION {ARCHIVE_COMPRESSION}"))
+
+
+def archive_closed_orders(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move closed orders created before cutoff to the archive; returns how many moved"""
+    moved = 0
+    while True:
+        picked = db.session.execute(
+            db.text(
+                "SELECT id, created_at FROM orders "
+                "WHERE created_at < :cutoff AND status IN :closed "
+                "ORDER BY created_at LIMIT :limit FOR UPDATE SKIP LOCKED"
+            ).bindparams(db.bindparam('closed', expanding=True)),
+            {'cutoff': cutoff, 'closed': list(TERMINAL_STATUSES), 'limit': batch_size}
+        ).all()
+        if not picked:
+            db.session.rollback()
+            return moved
+
+        set_lock_timeout()
+        ensure_archive_partitions({row.created_at.year for row in picked})
+        db.session.execute(db.text(ARCHIVE_SQL), {
+            'ids': [row.id for row in picked],
+            'created': [row.created_at for row in picked]
+        })
+        db.session.commit()
+        moved += len(picked)
+        logger.info(f"Archived {len(picked)} orders (through {picked[-1].created_at})")
+
+
+def drop_empty_partitions(cutoff):
+    """Detach and drop live partitions entirely before cutoff that archival emptied"""
+    dropped = []
+    partitions = db.session.scalars(db.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'orders'::regclass"
+    )).all()
+    for name in sorted(partitions):
+        match = MONTHLY_PARTITION.match(name)
+        if match:
+            month_end = add_months(date(int(match.group(1)), int(match.group(2)), 1), 1)
+            suffix = name[len('orders'):]
+        elif name == 'orders_legacy':
+            month_end, suffix = date.min, '_legacy'
+        else:
+            continue
+        if month_end > cutoff:
+            continue
+
+        items_name = f"order_items{suffix}"
+        empty = db.session.scalar(db.text(
+            f"SELECT NOT EXISTS (SELECT 1 FROM {name}) AND NOT EXISTS (SELECT 1 FROM {items_name})"
+        ))
+        if not empty:
+            continue
+
+        # Items first: the orders partition is referenced by their foreign key
+        set_lock_timeout()
+        for parent, partition in (('order_items', items_name), ('orders', name)):
+            db.session.execute(db.text(f"ALTER TABLE {parent} DETACH PARTITION {partition}"))
+            db.session.execute(db.text(f"DROP TABLE {partition}"))
+        db.session.commit()
+        dropped.append(name)
+    return dropped
+
+
+def maintain(batch_size=ARCHIVE_BATCH_SIZE):
+    if not is_partitioned('orders'):
+        logger.info('orders is not partitioned yet; run `python partitioning.py setup` first')
+        db.session.rollback()
+        return
+    ensure_partitions()
+    check_default_partitions()
+    cutoff = date.today() - timedelta(days=RETENTION_DAYS)
+    moved = archive_closed_orders(cutoff, batch_size)
+    dropped = drop_empty_partitions(cutoff)
+    logger.info(f"Maintenance done: {moved} orders archived, dropped partitions {dropped or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Partition maintenance and archival for orders')
+    parser.add_argument('command', choices=['setup', 'maintain', 'run'])
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        if args.command == 'setup':
+            setup()
+            return
+        while True:
+            try:
+                maintain(args.batch_size)
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"Partition maintenance failed: {e}")
+                if args.command == 'maintain':
+                    raise
+            if args.command == 'maintain':
+                return
+            time.sleep(INTERVAL)
+
+
+if __name__ == '__main__':
+    main()
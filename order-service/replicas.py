@@ -0,0 +1,214 @@
+# Generated from shared/replicas.py by scripts/sync_shared.py; edit that file, not this copy.
+import functools
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Seconds since the last replayed transaction, or 0 when fully caught up
+LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def is_write(clause):
+    return clause is not None and (
+        getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None
+    )
+
+
+class ReplicaRouter:
+    """Sends the reads of read-only requests to streaming replicas.
+
+    GET/HEAD requests (and views wrapped in `read_only`) read from a replica
+    when one is within max_lag seconds of the primary. A background thread
+    measures replay lag every check_interval seconds. Until a replica has
+    been measured, or while it lags or is unreachable, reads fall back to
+    the primary.
+
+    Read-your-writes: once a request writes, the rest of it uses the
+    primary. The caller's identity is also marked in Redis for
+    max_lag + check_interval seconds, and marked callers read from the
+    primary until any usable replica must have replayed their write.
+
+    Replicas are configured per bind key: None is the default engine.
+    """
+
+    def __init__(self, replica_urls, identity=None, redis_client=None, max_lag=2.0, check_interval=1.0,
+                 key_prefix='db:wrote:', engine_options=None):
+        self.identity = identity
+        self.redis = redis_client
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.key_prefix = key_prefix
+        self.sticky_ms = int((max_lag + check_interval) * 1000)
+        self.replicas = {
+            bind_key: [create_engine(url, pool_pre_ping=True, **(engine_options or {})) for url in urls]
+            for bind_key, urls in replica_urls.items() if urls
+        }
+        self._lag = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._checker_pid = None
+        self._stats = {'replica': 0, 'write': 0, 'sticky': 0, 'lagging': 0}
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def init_app(self, app):
+        app.after_request(self._remember_write)
+
+    def read_only(self, view):
+        """Let a non-GET view that only reads use replicas too"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g._db_read_only = True
+            return view(*args, **kwargs)
+        return wrapper
+
+    def use_primary(self):
+        """Send the rest of this request's reads to the primary; returns whether replicas were in use"""
+        if not has_request_context():
+            return False
+        was_using = g.get('_db_use_replica', False)
+        g._db_use_replica = False
+        return was_using
+
+    def route(self, bind_key, write=False):
+        """Replica engine for this read, or None to use the primary"""
+        if bind_key not in self.replicas or not has_request_context():
+            return None
+        if write:
+            if not g.get('_db_wrote'):
+                g._db_wrote = True
+                self._count('write')
+            return None
+        if g.get('_db_wrote'):
+            return None
+
+        if '_db_use_replica' not in g:
+            g._db_use_replica = self._request_may_use_replica()
+        if not g._db_use_replica:
+            return None
+
+        replica = self._pick(bind_key)
+        if replica is None:
+            self._count('lagging')
+        return replica
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['replicas'] = {
+                f"{bind_key or 'default'}/{index}": round(lag, 3) if lag is not None else None
+                for (bind_key, index), lag in self._lag.items()
+            }
+        return stats
+
+    def _request_may_use_replica(self):
+        if request.method not in READ_METHODS and not g.get('_db_read_only'):
+            return False
+        identity = self._current_identity()
+        if identity is not None and self.redis is not None:
+            try:
+                if self.redis.exists(f"{self.key_prefix}{identity}"):
+                    self._count('sticky')
+                    return False
+            except Exception as e:
+                logger.warning(f"Read-your-writes check failed, using primary: {e}")
+                return False
+        self._count('replica')
+        return True
+
+    def _remember_write(self, response):
+        if g.get('_db_wrote') and self.redis is not None:
+            identity = self._current_identity()
+            if identity is not None:
+                try:
+                    self.redis.set(f"{self.key_prefix}{identity}", 1, px=self.sticky_ms)
+                except Exception as e:
+                    logger.warning(f"Could not record write for read-your-writes: {e}")
+        return response
+
+    def _current_identity(self):
+        if self.identity is None:
+            return None
+        try:
+            return self.identity()
+        except Exception:
+            return None
+
+    def _pick(self, bind_key):
+        self._ensure_checker()
+        engines = self.replicas.get(bind_key)
+        if not engines:
+            return None
+        with self._lock:
+            healthy = [
+                engine for index, engine in enumerate(engines)
+                if (lag := self._lag.get((bind_key, index))) is not None and lag <= self.max_lag
+            ]
+            if not healthy:
+                return None
+            self._next += 1
+            return healthy[self._next % len(healthy)]
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _ensure_checker(self):
+        # One checker thread per process, started lazily so it survives forking servers
+        if self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._check_forever, name='replica-lag', daemon=True).start()
+
+    def _check_forever(self):
+        while True:
+            for bind_key, engines in self.replicas.items():
+                for index, engine in enumerate(engines):
+                    try:
+                        with engine.connect() as connection:
+                            lag = connection.execute(LAG_SQL).scalar()
+                        lag = float(lag) if lag is not None else None
+                    except Exception as e:
+                        logger.warning(f"Replica {bind_key or 'default'}/{index} lag check failed: {e}")
+                        lag = None
+                    with self._lock:
+                        self._lag[(bind_key, index)] = lag
+            time.sleep(self.check_interval)
+
+
+class ReplicaRoutingMixin:
+    """Session mixin asking the ReplicaRouter in info['replica_router'] where each read goes"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        router = self.info.get('replica_router')
+        if router is not None and bind is None:
+            replica = router.route(self.info.get('bind_key'), write=self._flushing or is_write(clause))
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class RoutingSession(ReplicaRoutingMixin, FlaskSession):
+    """Flask-SQLAlchemy session with replica routing for the default engine"""
+
+
+def replica_urls_from_env(name='DATABASE_REPLICA_URLS'):
+    return [url.strip() for url in os.getenv(name, '').split(',') if url.strip()]
@@ -0,0 +1,197 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import inject
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the upstream did not process the request
+RETRYABLE_STATUSES = {502, 503, 504}
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests.
+
+    Every request deposits `ratio` tokens and every retry spends one, with a
+    small per-second floor so low-traffic periods can still retry. When an
+    upstream is failing, retries stop instead of multiplying its load.
+    """
+
+    def __init__(self, ratio=0.1, min_per_second=2, max_tokens=50):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+
+class ServiceClient:
+    """Pooled HTTP client for one upstream service.
+
+    Connections are reused across requests, every call has connect/read
+    timeouts, retries draw from a shared budget, and per-operation timings
+    are kept for /metrics. Non-idempotent calls are only retried when the
+    connection could not be established. With a tracer, each call is a
+    client span and carries its traceparent to the upstream.
+    """
+
+    def __init__(self, name, base_url, timeout=(1, 5), max_retries=2, pool_size=20, budget=None, tracer=None):
+        self.name = name
+        self.tracer = tracer
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.budget = budget or RetryBudget()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, operation, **kwargs):
+        return self.request('GET', path, operation, idempotent=True, **kwargs)
+
+    def post(self, path, operation, idempotent=False, **kwargs):
+        return self.request('POST', path, operation, idempotent=idempotent, **kwargs)
+
+    def delete(self, path, operation, **kwargs):
+        return self.request('DELETE', path, operation, idempotent=True, **kwargs)
+
+    def request(self, method, path, operation, idempotent=False, timeout=None, headers=None, **kwargs):
+        """Send a request, retrying within budget; raises requests.RequestException on failure"""
+        if self.tracer is None:
+            return self._send(method, path, operation, idempotent, timeout, headers, **kwargs)
+        with self.tracer.span(f"{self.name} {operation}", kind='client', **{
+            'http.method': method,
+            'peer.service': self.name,
+            'http.target': path
+        }) as span:
+            response = self._send(method, path, operation, idempotent, timeout, inject(dict(headers or {})), **kwargs)
+            span.set_attribute('http.status_code', response.status_code)
+            span.error = response.status_code >= 500
+            return response
+
+    def _send(self, method, path, operation, idempotent, timeout, headers, **kwargs):
+        self.budget.deposit()
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                response = self.session.request(
+                    method,
+                    f"{self.base_url}{path}",
+                    timeout=timeout or self.timeout,
+                    headers=headers,
+                    **kwargs
+                )
+                if response.status_code in RETRYABLE_STATUSES and idempotent and self._may_retry(attempt):
+                    response.close()
+                    attempt += 1
+                    continue
+                self._record(operation, started, error=response.status_code >= 500)
+                return response
+            except requests.ConnectionError as e:
+                # Safe to retry even non-idempotent calls only if nothing reached the server
+                retry_safe = idempotent or isinstance(e, requests.ConnectTimeout) or 'Connection refused' in str(e)
+                if retry_safe and self._may_retry(attempt):
+                    attempt += 1
+                    continue
+                self._record(operation, started, error=True)
+                logger.error(f"{self.name} {operation} failed: {e}")
+                raise
+            except requests.RequestException as e:
+                if idempotent and self._may_retry(attempt):
+                    attempt += 1
+                    continue
+                self._record(operation, started, error=True)
+                logger.error(f"{self.name} {operation} failed: {e}")
+                raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                operation: dict(values, avg_ms=round(values['total_ms'] / values['count'], 2) if values['count'] else 0.0)
+                for operation, values in self._stats.items()
+            }
+
+    def _may_retry(self, attempt):
+        return attempt < self.max_retries and self.budget.withdraw()
+
+    def _record(self, operation, started, error=False):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._stats.setdefault(operation, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+class ServiceToken:
+    """Short-lived service-role access token from auth-service.
+
+    Fetched with this service's API key on first use and again refresh_margin
+    seconds before it expires. Other services accept it, with X-User-ID, as
+    acting for that user.
+    """
+
+    def __init__(self, auth_client, service, api_key, refresh_margin=30):
+        self.auth_client = auth_client
+        self.service = service
+        self.api_key = api_key
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._token is None or time.monotonic() >= self._expires_at - self.refresh_margin:
+                self._token, self._expires_at = self._fetch()
+            return self._token
+
+    def headers(self, user_id):
+        """Headers for a call made on behalf of user_id"""
+        return {'Authorization': f"Bearer {self.get()}", 'X-User-ID': str(user_id)}
+
+    def _fetch(self):
+        if not self.api_key:
+            raise RuntimeError(f"No API key configured for {self.service}")
+        response = self.auth_client.post(
+            '/api/auth/service-token',
+            'service_token',
+            json={'service': self.service, 'api_key': self.api_key}
+        )
+        if response.status_code != 201:
+            raise RuntimeError(f"auth-service refused a service token with status {response.status_code}")
+        body = response.json()
+        return body['token'], time.monotonic() + body['expires_in']
+
+
+# Shared pool for upstream calls that overlap with work on the request thread
+upstream_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='upstream')
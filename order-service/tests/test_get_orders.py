@@ -0,0 +1,105 @@
+"""GET /api/orders paging modes against a real Postgres.
+
+Needs TEST_DATABASE_URL pointing at a database the test may create and
+drop the get_orders_test schema in; skipped otherwise.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import jwt as pyjwt
+import pytest
+import sqlalchemy
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+SCHEMA = 'get_orders_test'
+KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+
+class StaticJWKS:
+    """Stands in for the auth-service JWKS endpoint"""
+
+    class SigningKey:
+        key = KEY.public_key()
+
+    def get_signing_key(self, kid):
+        return self.SigningKey()
+
+
+@pytest.fixture(scope='module')
+def app():
+    engine = sqlalchemy.create_engine(DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(sqlalchemy.text(f"CREATE SCHEMA {SCHEMA}"))
+
+    import app as app_module
+    from migrate import MIGRATIONS
+    from schema_migrations import MigrationRunner
+
+    # CONFIG is read once at import, so point it at the test schema directly
+    separator = '&' if '?' in DATABASE_URL else '?'
+    app_module.CONFIG['SQLALCHEMY_DATABASE_URI'] = f"{DATABASE_URL}{separator}options=-csearch_path%3D{SCHEMA}"
+    jwks_client = app_module.jwks_client
+    app_module.jwks_client = StaticJWKS()
+    app_module.revocation_list.is_revoked = lambda payload: False
+    app = app_module.create_app()
+    with app.app_context():
+        db = app_module.db
+        MigrationRunner(db.engine, MIGRATIONS).run()
+        start = datetime(2024, 1, 1)
+        for i in range(5):
+            db.session.execute(db.text(
+                "INSERT INTO orders (order_number, user_id, status, total_amount, created_at) "
+                "VALUES (:order_number, 1, 'pending', 10, :created_at)"
+            ), {'order_number': f"ORD-{i}", 'created_at': start + timedelta(days=i)})
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+    app_module.jwks_client = jwks_client
+    del app_module.revocation_list.is_revoked
+
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    now = int(time.time())
+    token = pyjwt.encode(
+        {'sub': '1', 'type': 'access', 'jti': 'test', 'iat': now, 'nbf': now, 'exp': now + 300},
+        KEY, algorithm='RS256', headers={'kid': 'test-key'}
+    )
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+    return client
+
+
+def test_legacy_page_requests_keep_total_and_pages(client):
+    response = client.get('/api/orders?page=2&per_page=2')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total'] == 5
+    assert body['pages'] == 3
+    assert body['current_page'] == 2
+    assert [order['order_number'] for order in body['orders']] == ['ORD-2', 'ORD-1']
+    assert 'next_cursor' not in body
+
+
+def test_cursor_mode_counts_only_when_asked(client):
+    first = client.get('/api/orders?per_page=2').get_json()
+    assert 'total' not in first and 'pages' not in first
+    assert [order['order_number'] for order in first['orders']] == ['ORD-4', 'ORD-3']
+
+    second = client.get(f"/api/orders?per_page=2&cursor={first['next_cursor']}&include_total=true").get_json()
+    assert second['total'] == 5
+    assert [order['order_number'] for order in second['orders']] == ['ORD-2', 'ORD-1']
@@ -0,0 +1,114 @@
+"""Idempotency-Key claims and replays, on a bare Flask app with an in-memory Redis."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idempotency import IdempotencyStore  # noqa: E402
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def gate():
+    return threading.Event()
+
+
+@pytest.fixture
+def app(calls, gate):
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY='test-secret-key-of-sufficient-length')
+    JWTManager(app)
+    idempotent = IdempotencyStore(FakeRedis(), wait_timeout=5, poll_interval=0.01)
+
+    @app.route('/orders', methods=['POST'])
+    @jwt_required()
+    @idempotent
+    def create_order():
+        body = request.get_json()
+        calls.append(body)
+        if body.get('wait'):
+            gate.wait(5)
+        if body.get('fail'):
+            return jsonify({'error': 'upstream down'}), 503
+        return jsonify({'order': len(calls)}), 201
+
+    return app
+
+
+def post(app, body, key='key-1', user='1'):
+    with app.app_context():
+        token = create_access_token(identity=user)
+    return app.test_client().post('/orders', json=body, headers={
+        'Authorization': f"Bearer {token}",
+        'Idempotency-Key': key
+    })
+
+
+def test_retry_replays_the_stored_response(app, calls):
+    first = post(app, {'item': 1})
+    retry = post(app, {'item': 1})
+
+    assert (first.status_code, first.get_json()) == (201, {'order': 1})
+    assert (retry.status_code, retry.get_json()) == (201, {'order': 1})
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert len(calls) == 1
+
+
+def test_keys_are_scoped_per_user_and_bound_to_the_body(app, calls):
+    post(app, {'item': 1})
+
+    assert post(app, {'item': 1}, user='2').status_code == 201
+    assert post(app, {'item': 2}).status_code == 422
+    assert len(calls) == 2
+
+
+def test_server_errors_release_the_key(app, calls):
+    assert post(app, {'fail': True}).status_code == 503
+    assert post(app, {'fail': True}).status_code == 503
+    assert len(calls) == 2
+
+
+def test_concurrent_duplicate_waits_for_the_first_result(app, calls, gate):
+    first = {}
+    thread = threading.Thread(target=lambda: first.update(response=post(app, {'wait': True})))
+    thread.start()
+    while not calls:
+        time.sleep(0.01)
+
+    # The duplicate finds the key claimed and polls until the first one finishes
+    threading.Timer(0.1, gate.set).start()
+    duplicate = post(app, {'wait': True})
+    thread.join()
+
+    assert len(calls) == 1
+    assert duplicate.status_code == first['response'].status_code == 201
+    assert duplicate.get_json() == first['response'].get_json()
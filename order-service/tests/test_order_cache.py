@@ -0,0 +1,84 @@
+"""OrderCache fills, refreshes and invalidation tombstones, against an in-memory Redis."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_cache import OrderCache  # noqa: E402
+
+
+class FakeRedis:
+    """The few string commands OrderCache uses; expiry is driven by expire_all()"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def expire_all(self):
+        self.data.clear()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+
+    def execute(self):
+        return [self.redis.set(*args, **kwargs) for args, kwargs in self.commands]
+
+
+def test_fills_on_miss_and_serves_hits():
+    cache = OrderCache(FakeRedis())
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'status': 'pending'}
+
+    assert cache.get('ORD-1', 7, loader) == '{"status": "pending"}'
+    assert cache.get('ORD-1', 7, loader) == '{"status": "pending"}'
+    assert len(loads) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_fill_read_before_an_invalidation_is_rejected():
+    redis = FakeRedis()
+    cache = OrderCache(redis)
+
+    def slow_loader():
+        # The reader has the old row; meanwhile a bulk update commits and invalidates
+        cache.invalidate([('ORD-1', 7)])
+        return {'status': 'pending'}
+
+    assert cache.get('ORD-1', 7, slow_loader) == '{"status": "pending"}'
+    assert cache.get('ORD-1', 7, lambda: {'status': 'shipped'}) == '{"status": "shipped"}'
+
+    # Nothing stale got in; once the tombstone lapses, readers fill again
+    redis.expire_all()
+    assert cache.get('ORD-1', 7, lambda: {'status': 'shipped'}) == '{"status": "shipped"}'
+    assert redis.get(cache.key('ORD-1', 7)) == '{"status": "shipped"}'
+
+
+def test_refresh_replaces_a_tombstone():
+    redis = FakeRedis()
+    cache = OrderCache(redis)
+    cache.invalidate([('ORD-1', 7), ('ORD-2', 7)])
+
+    cache.refresh('ORD-1', 7, {'status': 'cancelled'})
+
+    assert cache.get('ORD-1', 7, lambda: None) == '{"status": "cancelled"}'
+    assert cache.stats()['invalidations'] == 2
@@ -0,0 +1,97 @@
+"""Snowflake order numbers: ordering, uniqueness and node leasing, without Redis or a database."""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import order_ids  # noqa: E402
+from order_ids import NodeIdUnavailable, OrderIdGenerator, order_number_timestamp  # noqa: E402
+
+
+class FakeRedis:
+    """SET NX leases and the renew/release scripts, which only ever succeed here"""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def eval(self, script, numkeys, *args):
+        return 1
+
+
+def test_numbers_from_one_node_are_unique_and_sort_in_generation_order():
+    generator = OrderIdGenerator(node_id=5)
+
+    numbers = [generator.next_order_number() for _ in range(20000)]
+
+    assert len(set(numbers)) == len(numbers)
+    assert sorted(numbers) == numbers
+    assert all(number.startswith('ORD-') and len(number) == 17 for number in numbers)
+
+
+def test_sequence_overflow_moves_to_the_next_millisecond(monkeypatch):
+    clock = [1_800_000_000.0]
+    monkeypatch.setattr(order_ids.time, 'time', lambda: clock[0])
+
+    def tick(seconds):
+        clock[0] += 0.001
+
+    monkeypatch.setattr(order_ids.time, 'sleep', tick)
+    generator = OrderIdGenerator(node_id=1)
+
+    ids = [generator.next_id() for _ in range(order_ids.MAX_SEQUENCE + 2)]
+
+    assert ids == sorted(set(ids))
+    assert ids[-1] >> (order_ids.NODE_BITS + order_ids.SEQUENCE_BITS) == \
+        (ids[0] >> (order_ids.NODE_BITS + order_ids.SEQUENCE_BITS)) + 1
+
+
+def test_keeps_increasing_when_the_clock_steps_back(monkeypatch):
+    clock = [1_800_000_000.0]
+    monkeypatch.setattr(order_ids.time, 'time', lambda: clock[0])
+    generator = OrderIdGenerator(node_id=1)
+
+    first = generator.next_id()
+    clock[0] -= 5
+    assert generator.next_id() > first
+
+
+def test_nodes_never_collide_within_a_millisecond(monkeypatch):
+    monkeypatch.setattr(order_ids.time, 'time', lambda: 1_800_000_000.0)
+    first, second = OrderIdGenerator(node_id=1), OrderIdGenerator(node_id=2)
+
+    assert first.next_id() != second.next_id()
+
+
+def test_order_number_timestamp_round_trips():
+    number = OrderIdGenerator(node_id=3).next_order_number()
+
+    assert abs(order_number_timestamp(number) - datetime.utcnow()) < timedelta(seconds=5)
+    assert order_number_timestamp('ORD-20240315-0A1B2C3D') == datetime(2024, 3, 15)
+    assert order_number_timestamp('not-an-order') is None
+
+
+def test_leases_distinct_nodes_from_redis():
+    redis = FakeRedis()
+    first, second = OrderIdGenerator(redis), OrderIdGenerator(redis)
+
+    assert first.node_id != second.node_id
+    assert sorted(redis.data) == sorted(f"orders:id-node:{node}" for node in (first.node_id, second.node_id))
+
+
+def test_fails_closed_without_a_node():
+    with pytest.raises(NodeIdUnavailable):
+        OrderIdGenerator().next_order_number()
+
+    redis = FakeRedis()
+    redis.data = {f"orders:id-node:{node}": 'taken' for node in range(order_ids.MAX_NODE + 1)}
+    with pytest.raises(NodeIdUnavailable):
+        OrderIdGenerator(redis).next_order_number()
@@ -0,0 +1,121 @@
+"""ReplicaRouter decisions: lag, request method and read-your-writes, without a database."""
+import os
+import sys
+
+import pytest
+from flask import Flask, g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replicas import ReplicaRouter  # noqa: E402
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+
+
+class BrokenRedis:
+    def exists(self, key):
+        raise ConnectionError('redis is down')
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def make_router(redis=None, lags=(0.1,), max_lag=2.0):
+    # Engines are never connected to; lag is set here instead of by the checker thread
+    router = ReplicaRouter({None: ['sqlite://'] * len(lags)}, identity=lambda: g.get('user'),
+                           redis_client=redis, max_lag=max_lag)
+    router._checker_pid = os.getpid()
+    router._lag = {(None, index): lag for index, lag in enumerate(lags)}
+    return router
+
+
+def test_reads_of_get_requests_go_to_a_caught_up_replica(app):
+    router = make_router()
+
+    with app.test_request_context('/orders'):
+        assert router.route(None) is router.replicas[None][0]
+    with app.test_request_context('/orders', method='POST'):
+        assert router.route(None) is None
+
+
+@pytest.mark.parametrize('lag', [None, 2.5])
+def test_unmeasured_or_lagging_replicas_fall_back_to_the_primary(app, lag):
+    router = make_router(lags=(lag,))
+
+    with app.test_request_context('/orders'):
+        assert router.route(None) is None
+    assert router.stats()['lagging'] == 1
+
+
+def test_reads_rotate_over_healthy_replicas_only(app):
+    router = make_router(lags=(0.1, 9.0, 0.2))
+    replicas = router.replicas[None]
+
+    with app.test_request_context('/orders'):
+        picked = {router.route(None) for _ in range(4)}
+
+    assert picked == {replicas[0], replicas[2]}
+
+
+def test_read_only_views_may_use_replicas(app):
+    router = make_router()
+
+    with app.test_request_context('/orders/search', method='POST'):
+        assert router.read_only(lambda: router.route(None))() is router.replicas[None][0]
+
+
+def test_a_write_sends_the_rest_of_the_request_to_the_primary(app):
+    router = make_router()
+
+    with app.test_request_context('/orders'):
+        assert router.route(None) is not None
+        assert router.route(None, write=True) is None
+        assert router.route(None) is None
+
+
+def test_use_primary_pins_the_request(app):
+    router = make_router()
+
+    with app.test_request_context('/orders'):
+        assert router.route(None) is not None
+        assert router.use_primary() is True
+        assert router.route(None) is None
+
+
+def test_writers_read_their_writes_from_the_primary_on_later_requests(app):
+    redis = FakeRedis()
+    router = make_router(redis)
+    router.init_app(app)
+
+    with app.test_request_context('/orders', method='POST'):
+        g.user = 7
+        router.route(None, write=True)
+        app.process_response(app.response_class())
+    assert redis.data == {'db:wrote:7': 1}
+
+    with app.test_request_context('/orders'):
+        g.user = 7
+        assert router.route(None) is None
+    with app.test_request_context('/orders'):
+        g.user = 8
+        assert router.route(None) is not None
+    assert router.stats()['sticky'] == 1
+
+
+def test_redis_errors_fall_back_to_the_primary(app):
+    router = make_router(BrokenRedis())
+
+    with app.test_request_context('/orders'):
+        g.user = 7
+        assert router.route(None) is None
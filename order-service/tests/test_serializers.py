@@ -0,0 +1,92 @@
+"""Compiled order serializers against the hand-written to_dict they replaced, without a database."""
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import Order, OrderItem  # noqa: E402
+from json_provider import compile_serializer  # noqa: E402
+
+
+def legacy_item_dict(item):
+    return {
+        'id': item.id,
+        'product_id': item.product_id,
+        'product_name': item.product_name,
+        'price': float(item.price),
+        'quantity': item.quantity,
+        'product_image_url': item.product_image_url,
+        'subtotal': float(item.quantity * item.price)
+    }
+
+
+def legacy_order_dict(order):
+    def isoformat(value):
+        return value.isoformat() if value else None
+
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'user_id': order.user_id,
+        'status': order.status,
+        'total_amount': float(order.total_amount),
+        'payment_id': order.payment_id,
+        'shipping_address': order.shipping_address,
+        'billing_address': order.billing_address,
+        'notes': order.notes,
+        'items': [legacy_item_dict(item) for item in order.items],
+        'created_at': isoformat(order.created_at),
+        'updated_at': isoformat(order.updated_at),
+        'shipped_at': isoformat(order.shipped_at),
+        'delivered_at': isoformat(order.delivered_at)
+    }
+
+
+@pytest.fixture
+def order():
+    return Order(
+        id=12,
+        order_number='ORD-0000000000001',
+        user_id=7,
+        status='shipped',
+        total_amount=Decimal('59.97'),
+        payment_id=None,
+        shipping_address={'city': 'Springfield'},
+        billing_address=None,
+        notes='Leave at the door',
+        created_at=datetime(2024, 5, 1, 12, 30),
+        updated_at=datetime(2024, 5, 2, 8, 0, 15, 250000),
+        shipped_at=datetime(2024, 5, 2, 8, 0),
+        delivered_at=None,
+        items=[
+            OrderItem(id=1, product_id=3, product_name='Cable', price=Decimal('9.99'), quantity=3,
+                      product_image_url=None),
+            OrderItem(id=2, product_id=4, product_name='Charger', price=Decimal('30.00'), quantity=1,
+                      product_image_url='/img/4.png')
+        ]
+    )
+
+
+def test_matches_the_legacy_to_dict(order):
+    serialized = order.to_dict()
+
+    assert serialized == legacy_order_dict(order)
+    assert list(serialized) == list(legacy_order_dict(order))
+
+
+def test_field_selections_keep_the_requested_subset(order):
+    fields = ('order_number', 'status', 'total_amount', 'created_at')
+
+    assert order.to_dict(fields) == {name: legacy_order_dict(order)[name] for name in fields}
+
+
+def test_applies_converters_and_rejects_expressions():
+    serialize = compile_serializer({'name': 'product_name', 'price': ('price', float)})
+
+    assert serialize(OrderItem(product_name='Cable', price=Decimal('9.99'))) == {'name': 'Cable', 'price': 9.99}
+    with pytest.raises(ValueError):
+        compile_serializer({'name': '__class__.__name__'})
@@ -0,0 +1,75 @@
+"""ServiceToken fetching and reuse, against a fake auth-service client."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import service_client  # noqa: E402
+from service_client import ServiceToken  # noqa: E402
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeAuthClient:
+    def __init__(self, status_code=201, expires_in=300):
+        self.status_code = status_code
+        self.expires_in = expires_in
+        self.calls = []
+
+    def post(self, path, operation, json=None):
+        self.calls.append((path, json))
+        return Response(self.status_code, {'token': f"token-{len(self.calls)}", 'expires_in': self.expires_in})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(service_client.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_fetches_once_and_reuses_the_token(clock):
+    auth = FakeAuthClient()
+    token = ServiceToken(auth, 'order-service', 'key')
+
+    assert token.headers(7) == {'Authorization': 'Bearer token-1', 'X-User-ID': '7'}
+    assert token.get() == 'token-1'
+    assert auth.calls == [('/api/auth/service-token', {'service': 'order-service', 'api_key': 'key'})]
+
+
+def test_refreshes_before_expiry(clock):
+    auth = FakeAuthClient(expires_in=300)
+    token = ServiceToken(auth, 'order-service', 'key', refresh_margin=30)
+    token.get()
+
+    clock[0] += 269
+    assert token.get() == 'token-1'
+    clock[0] += 1
+    assert token.get() == 'token-2'
+
+
+def test_refusal_raises_and_is_not_cached(clock):
+    auth = FakeAuthClient(status_code=401)
+    token = ServiceToken(auth, 'order-service', 'wrong')
+
+    with pytest.raises(RuntimeError):
+        token.get()
+    auth.status_code = 201
+    assert token.get() == 'token-2'
+
+
+def test_requires_an_api_key():
+    auth = FakeAuthClient()
+
+    with pytest.raises(RuntimeError):
+        ServiceToken(auth, 'order-service', None).get()
+    assert auth.calls == []
@@ -0,0 +1,331 @@
+# Generated from shared/tracing.py by scripts/sync_shared.py; edit that file, not this copy.
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+import requests
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = 'traceparent'
+_TRACEPARENT = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_INVALID_TRACE_ID = '0' * 32
+_INVALID_SPAN_ID = '0' * 16
+
+# OTLP span kinds
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def parse_traceparent(value):
+    """(trace_id, parent span id, sampled) from a traceparent header, or None if invalid"""
+    match = _TRACEPARENT.match((value or '').strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == 'ff' or trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def inject(headers):
+    """Add the current span's traceparent to outgoing headers, replacing any present"""
+    span = current_span()
+    for key in [key for key in headers if key.lower() == TRACEPARENT_HEADER]:
+        del headers[key]
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent()
+    return headers
+
+
+class Span:
+    __slots__ = ('name', 'kind', 'trace_id', 'span_id', 'parent_id', 'sampled',
+                 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name, kind, trace_id, parent_id, sampled):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.error = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class FileSpanSink:
+    """Appends spans as JSON lines; the local stand-in for a collector"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, service, spans):
+        lines = ''.join(json.dumps(dict(span.to_dict(), service=service)) + '\n' for span in spans)
+        with open(self.path, 'a') as f:
+            f.write(lines)
+
+
+class OTLPHttpSink:
+    """Posts spans to an OpenTelemetry collector's OTLP/HTTP JSON endpoint"""
+
+    def __init__(self, endpoint, timeout=2):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def write(self, service, spans):
+        self.session.post(self.url, json={
+            'resourceSpans': [{
+                'resource': {'attributes': [_otlp_attribute('service.name', service)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'tracing'},
+                    'spans': [
+                        {
+                            'traceId': span.trace_id,
+                            'spanId': span.span_id,
+                            'parentSpanId': span.parent_id or '',
+                            'name': span.name,
+                            'kind': SPAN_KINDS[span.kind],
+                            'startTimeUnixNano': str(span.start_ns),
+                            'endTimeUnixNano': str(span.end_ns),
+                            'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                            'status': {'code': 2 if span.error else 1}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }, timeout=self.timeout).raise_for_status()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class BatchSpanExporter:
+    """Non-blocking span export.
+
+    export() only enqueues; a daemon thread, started lazily in each
+    process (gunicorn forks workers after import), writes what has
+    collected once per interval, or full batches of batch_size back to
+    back while spans arrive faster than that. Spans that do not fit in the
+    queue are counted and dropped.
+    """
+
+    def __init__(self, sink, service, max_queue=2048, batch_size=256, interval=1.0):
+        self.sink = sink
+        self.service = service
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread_pid = None
+        self._lock = threading.Lock()
+        self._stats = {'exported': 0, 'dropped': 0, 'failed_batches': 0}
+
+    def export(self, span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def flush(self):
+        while not self._queue.empty():
+            self._write(self._drain())
+
+    def _ensure_thread(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name='span-exporter', daemon=True).start()
+            atexit.register(self.flush)
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = self._drain(wait=self.interval)
+            self._write(batch)
+            if len(batch) < self.batch_size:
+                time.sleep(self.interval)
+
+    def _drain(self, wait=None):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=wait) if wait else self._queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.sink.write(self.service, batch)
+            with self._lock:
+                self._stats['exported'] += len(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats['failed_batches'] += 1
+                self._stats['dropped'] += len(batch)
+            logger.warning(f"Span export failed: {e}")
+
+
+class Tracer:
+    """W3C trace context propagation with span export.
+
+    Every request becomes a server span joined to the caller's trace
+    through its traceparent header; calls made inside
+    span(..., kind='client') send a traceparent of their own, so a
+    checkout reads as gateway -> order-service -> cart/payment with the
+    time spent at each hop. A request without a valid traceparent starts
+    a new trace, sampled at sample_rate; otherwise the caller's sampling
+    decision is kept, so a trace is recorded at every hop or at none.
+    Unsampled traces still propagate their ids but export nothing.
+    """
+
+    def __init__(self, service, exporter=None, sample_rate=1.0):
+        self.service = service
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @contextlib.contextmanager
+    def span(self, name, kind='internal', **attributes):
+        parent = current_span()
+        span = self._new_span(name, kind, (parent.trace_id, parent.span_id, parent.sampled) if parent else None)
+        span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._tag_response)
+        app.teardown_request(self._end_request)
+
+    def stats(self):
+        return self.exporter.stats() if self.exporter is not None else {'exporter': None}
+
+    def _start_request(self):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        span = self._new_span(
+            f"{request.method} {route}",
+            'server',
+            parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+        )
+        span.attributes.update({'http.method': request.method, 'http.route': route})
+        g._trace_span = span
+        g._trace_token = _current_span.set(span)
+
+    def _tag_response(self, response):
+        span = g.get('_trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            span.error = response.status_code >= 500
+            response.headers['X-Trace-Id'] = span.trace_id
+        return response
+
+    def _end_request(self, exc=None):
+        span = g.pop('_trace_span', None)
+        if span is None:
+            return
+        if exc is not None:
+            span.error = True
+        try:
+            _current_span.reset(g.pop('_trace_token'))
+        except ValueError:
+            # Streamed responses tear down outside the context the span was set in
+            _current_span.set(None)
+        self._finish(span)
+
+    def _new_span(self, name, kind, parent):
+        """parent is (trace_id, span_id, sampled), or None to start a trace"""
+        if parent is None:
+            return Span(name, kind, os.urandom(16).hex(), None, random.random() < self.sample_rate)
+        trace_id, parent_id, sampled = parent
+        return Span(name, kind, trace_id, parent_id, sampled)
+
+    def _finish(self, span):
+        span.end_ns = time.time_ns()
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+
+def tracer_from_env(service):
+    """Tracer configured by TRACE_EXPORTER (none, file or otlp) and friends"""
+    kind = os.getenv('TRACE_EXPORTER', 'none')
+    if kind == 'file':
+        sink = FileSpanSink(os.getenv('TRACE_FILE', f"/tmp/traces/{service}.jsonl"))
+    elif kind == 'otlp':
+        sink = OTLPHttpSink(os.getenv('OTLP_ENDPOINT', 'http://otel-collector:4318'))
+    elif kind == 'none':
+        sink = None
+    else:
+        raise ValueError(f"Unknown TRACE_EXPORTER: {kind}")
+    exporter = BatchSpanExporter(
+        sink,
+        service,
+        max_queue=int(os.getenv('TRACE_QUEUE_SIZE', 2048)),
+        batch_size=int(os.getenv('TRACE_BATCH_SIZE', 256)),
+        interval=float(os.getenv('TRACE_EXPORT_INTERVAL', 1))
+    ) if sink is not None else None
+    return Tracer(service, exporter, sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', 1.0)))
@@ -7,6 +7,7 @@ import (
 	"os"
 	"os/signal"
 	"strconv"
+	"strings"
 	"syscall"
 	"time"
 
@@ -53,6 +54,9 @@ type ProductResponse struct {
 	UpdatedAt   time.Time `json:"updated_at"`
 }
 
+// maxBatchIDs bounds the ids= filter on GET /products
+const maxBatchIDs = 200
+
 type ProductService struct {
 	db    *gorm.DB
 	redis *redis.Client
@@ -88,6 +92,23 @@ func (s *ProductService) GetProducts(c *gin.Context) {
 
 	query := s.db.Where("is_active = ?", true)
 
+	// Batch lookup by id, used by cart-service to revalidate a whole cart in one call
+	if idsParam := c.Query("ids"); idsParam != "" {
+		var ids []uint
+		for _, raw := range strings.Split(idsParam, ",") {
+			if parsed, err := strconv.ParseUint(strings.TrimSpace(raw), 10, 64); err == nil {
+				ids = append(ids, uint(parsed))
+			}
+		}
+		if len(ids) == 0 || len(ids) > maxBatchIDs {
+			c.JSON(http.StatusBadRequest, gin.H{"error": "ids must contain between 1 and 200 product ids"})
+			return
+		}
+		query = query.Where("id IN ?", ids)
+		limit = len(ids)
+		offset = 0
+	}
+
 	if category != "" {
 		query = query.Where("category = ?", category)
 	}
@@ -0,0 +1,220 @@
+"""Microbenchmark: API response serialization, old path vs the fast JSON provider.
+
+Builds realistic order and cart payloads (model-like objects holding
+Decimal prices and datetimes) and times, per payload:
+
+  current   per-field lambdas + Flask's stdlib encoding (sorted keys)
+  stdlib    compiled serializers + stdlib json, unsorted (JSON_BACKEND=stdlib)
+  orjson    compiled serializers + orjson (the default when installed)
+
+Field layouts mirror Order/OrderItem in order-service and Cart/CartItem in
+cart-service. Needs the order-service requirements (Flask, orjson).
+
+Usage: python scripts/bench_json.py [--number 200] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'order-service'))
+
+from json_provider import compile_serializer, json_default, orjson  # noqa: E402
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def build_order(index, item_count):
+    created_at = datetime(2024, 5, 1, 12, 0, 0) + timedelta(minutes=index)
+    items = [
+        SimpleNamespace(
+            id=index * 100 + line,
+            product_id=1000 + line,
+            product_name=f"Product {line} with a realistic, fairly long display name",
+            price=Decimal('19.99') + line,
+            quantity=1 + line % 3,
+            product_image_url=f"https://cdn.example.com/products/{1000 + line}/main.jpg",
+            added_at=created_at
+        )
+        for line in range(item_count)
+    ]
+    for item in items:
+        item.subtotal = item.quantity * item.price
+    address = {
+        'street': '221B Baker Street', 'city': 'London', 'state': 'Greater London',
+        'postal_code': 'NW1 6XE', 'country': 'GB', 'phone': '+44 20 7946 0000'
+    }
+    return SimpleNamespace(
+        id=index,
+        order_number=f"ORD-{index:013d}",
+        user_id=42,
+        status='confirmed',
+        total_amount=sum(item.subtotal for item in items),
+        payment_id=f"pi_{index:024d}",
+        shipping_address=address,
+        billing_address=address,
+        notes=None,
+        items=items,
+        created_at=created_at,
+        updated_at=created_at + timedelta(minutes=5),
+        shipped_at=None,
+        delivered_at=None,
+        # Cart fields, for the cart payload
+        session_id=None
+    )
+
+
+# The per-field lambdas the services used before compiled serializers
+def legacy_item(item):
+    return {
+        'id': item.id,
+        'product_id': item.product_id,
+        'product_name': item.product_name,
+        'price': float(item.price),
+        'quantity': item.quantity,
+        'product_image_url': item.product_image_url,
+        'subtotal': float(item.quantity * item.price)
+    }
+
+
+LEGACY_ORDER_FIELDS = {
+    'id': lambda order: order.id,
+    'order_number': lambda order: order.order_number,
+    'user_id': lambda order: order.user_id,
+    'status': lambda order: order.status,
+    'total_amount': lambda order: float(order.total_amount),
+    'payment_id': lambda order: order.payment_id,
+    'shipping_address': lambda order: order.shipping_address,
+    'billing_address': lambda order: order.billing_address,
+    'notes': lambda order: order.notes,
+    'items': lambda order: [legacy_item(item) for item in order.items],
+    'created_at': lambda order: isoformat(order.created_at),
+    'updated_at': lambda order: isoformat(order.updated_at),
+    'shipped_at': lambda order: isoformat(order.shipped_at),
+    'delivered_at': lambda order: isoformat(order.delivered_at)
+}
+
+
+def legacy_order(order):
+    return {name: field(order) for name, field in LEGACY_ORDER_FIELDS.items()}
+
+
+def legacy_cart(cart):
+    return {
+        'id': cart.id,
+        'user_id': cart.user_id,
+        'session_id': cart.session_id,
+        'items': [dict(legacy_item(item), added_at=isoformat(item.added_at)) for item in cart.items],
+        'total_items': sum(item.quantity for item in cart.items),
+        'total_amount': float(sum(item.quantity * item.price for item in cart.items)),
+        'created_at': isoformat(cart.created_at),
+        'updated_at': isoformat(cart.updated_at)
+    }
+
+
+ITEM_FIELDS = {
+    'id': 'id',
+    'product_id': 'product_id',
+    'product_name': 'product_name',
+    'price': ('price', float),
+    'quantity': 'quantity',
+    'product_image_url': 'product_image_url',
+    'subtotal': ('subtotal', float)
+}
+serialize_order_item = compile_serializer(ITEM_FIELDS, name='serialize_order_item')
+serialize_cart_item = compile_serializer(dict(ITEM_FIELDS, added_at=('added_at', isoformat)), name='serialize_cart_item')
+serialize_order = compile_serializer({
+    'id': 'id',
+    'order_number': 'order_number',
+    'user_id': 'user_id',
+    'status': 'status',
+    'total_amount': ('total_amount', float),
+    'payment_id': 'payment_id',
+    'shipping_address': 'shipping_address',
+    'billing_address': 'billing_address',
+    'notes': 'notes',
+    'items': ('items', lambda items: [serialize_order_item(item) for item in items]),
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+    'shipped_at': ('shipped_at', isoformat),
+    'delivered_at': ('delivered_at', isoformat)
+}, name='serialize_order')
+
+
+def compiled_cart(cart):
+    items = cart.items
+    return {
+        'id': cart.id,
+        'user_id': cart.user_id,
+        'session_id': cart.session_id,
+        'items': [serialize_cart_item(item) for item in items],
+        'total_items': sum(item.quantity for item in items),
+        'total_amount': float(sum(item.subtotal for item in items)),
+        'created_at': isoformat(cart.created_at),
+        'updated_at': isoformat(cart.updated_at)
+    }
+
+
+def encode_current(payload):
+    # What jsonify did with Flask's default provider outside debug mode
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+def encode_stdlib(payload):
+    return json.dumps(payload, default=json_default, separators=(',', ':'))
+
+
+def encode_orjson(payload):
+    return orjson.dumps(payload, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+PAYLOADS = {
+    'order (5 items)': ('order', [build_order(1, 5)]),
+    'order (100 items)': ('order', [build_order(1, 100)]),
+    'order history page (50 orders x 3 items)': ('orders', [build_order(index, 3) for index in range(50)]),
+    'cart (40 items)': ('cart', [build_order(1, 40)])
+}
+
+
+def paths(kind, rows):
+    if kind == 'cart':
+        legacy, compiled = (lambda: legacy_cart(rows[0])), (lambda: compiled_cart(rows[0]))
+    elif kind == 'order':
+        legacy, compiled = (lambda: legacy_order(rows[0])), (lambda: serialize_order(rows[0]))
+    else:
+        legacy = lambda: {'orders': [legacy_order(row) for row in rows]}
+        compiled = lambda: {'orders': [serialize_order(row) for row in rows]}
+    result = {
+        'current': lambda: encode_current(legacy()),
+        'stdlib': lambda: encode_stdlib(compiled())
+    }
+    if orjson is not None:
+        result['orjson'] = lambda: encode_orjson(compiled())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare API response serialization paths')
+    parser.add_argument('--number', type=int, default=200, help='serializations per timing run')
+    parser.add_argument('--repeat', type=int, default=5, help='timing runs; the best one is reported')
+    args = parser.parse_args()
+
+    if orjson is None:
+        print('orjson is not installed; only the stdlib paths are measured\n')
+    print(f"{'payload':<44}{'path':<10}{'us/op':>10}{'speedup':>10}")
+    for label, (kind, rows) in PAYLOADS.items():
+        baseline = None
+        for path, run in paths(kind, rows).items():
+            seconds = min(timeit.repeat(run, number=args.number, repeat=args.repeat)) / args.number
+            baseline = baseline or seconds
+            print(f"{label:<44}{path:<10}{seconds * 1e6:>10.1f}{baseline / seconds:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
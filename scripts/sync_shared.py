@@ -0,0 +1,70 @@
+"""Copy the shared Python modules in shared/ into the services that use them.
+
+Each service image is built from its own directory, so modules used by
+several services are kept once in shared/ and copied in by this script.
+The copies carry a header saying where they come from; edit the file in
+shared/ and re-run the script instead of changing a copy. CI runs it with
+--check, which fails when a copy differs from its source.
+
+Usage: python scripts/sync_shared.py [--check]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared module -> services that get a copy
+SHARED_MODULES = {
+    'gunicorn.conf.py': ['auth-service', 'cart-service', 'order-service', 'gateway'],
+    'request_logging.py': ['auth-service', 'cart-service', 'order-service', 'gateway'],
+    'tracing.py': ['auth-service', 'cart-service', 'order-service', 'gateway'],
+    'json_provider.py': ['auth-service', 'cart-service', 'order-service'],
+    'replicas.py': ['auth-service', 'cart-service', 'order-service'],
+    'revocation.py': ['auth-service', 'cart-service', 'order-service'],
+    'schema_migrations.py': ['auth-service', 'cart-service', 'order-service'],
+    'sql_stats.py': ['auth-service', 'cart-service', 'order-service']
+}
+
+HEADER = '# Generated from shared/{name} by scripts/sync_shared.py; edit that file, not this copy.\n'
+
+
+def expected_copy(name):
+    with open(os.path.join(ROOT, 'shared', name)) as f:
+        return HEADER.format(name=name) + f.read()
+
+
+def sync(check=False):
+    """Write (or with check, compare) every copy; returns the stale copies' paths"""
+    stale = []
+    for name, services in SHARED_MODULES.items():
+        content = expected_copy(name)
+        for service in services:
+            path = os.path.join(ROOT, service, name)
+            current = None
+            if os.path.exists(path):
+                with open(path) as f:
+                    current = f.read()
+            if current == content:
+                continue
+            stale.append(os.path.relpath(path, ROOT))
+            if not check:
+                with open(path, 'w') as f:
+                    f.write(content)
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy shared modules into the services')
+    parser.add_argument('--check', action='store_true', help='only report copies that differ from shared/')
+    args = parser.parse_args()
+
+    stale = sync(check=args.check)
+    for path in stale:
+        print(f"{'Out of date' if args.check else 'Updated'}: {path}")
+    if args.check and stale:
+        sys.exit('Run python scripts/sync_shared.py and commit the result')
+
+
+if __name__ == '__main__':
+    main()
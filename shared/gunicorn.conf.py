@@ -0,0 +1,60 @@
+"""gunicorn settings for the production serving profile.
+
+WEB_CONCURRENCY              worker processes (default 2 x CPUs + 1)
+GUNICORN_WORKER_CLASS        gthread (a thread pool per worker) or gevent (cooperative)
+GUNICORN_THREADS             threads per gthread worker (default 4)
+GUNICORN_WORKER_CONNECTIONS  concurrent requests per gevent worker (default 100)
+DB_CONNECTION_BUDGET         connections all workers together may open to one database (default 40)
+
+Connection pools are sized from these settings and passed to the app
+through the environment before workers start. Each worker gets enough
+pooled connections for its concurrent requests, up to its share of
+DB_CONNECTION_BUDGET, and overflow fills the rest of that share. Setting
+DB_POOL_SIZE, DB_MAX_OVERFLOW or UPSTREAM_POOL_SIZE explicitly wins.
+
+gevent needs psycogreen so psycopg2 yields while waiting on the database.
+Services with long-lived responses (order-service's SSE streams) need
+gevent, since under gthread every open stream holds one of the few
+threads. Services that hash passwords in a process pool (auth-service)
+should stay on gthread.
+"""
+import importlib.util
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# Requests are logged by the app, sampled and structured (request_logging.py)
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# Requests one worker can have in flight
+worker_concurrency = worker_connections if worker_class == 'gevent' else threads
+
+connection_budget = int(os.getenv('DB_CONNECTION_BUDGET', 40))
+connections_per_worker = max(1, connection_budget // workers)
+db_pool_size = min(worker_concurrency, connections_per_worker)
+os.environ.setdefault('DB_POOL_SIZE', str(db_pool_size))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(connections_per_worker - db_pool_size))
+os.environ.setdefault('UPSTREAM_POOL_SIZE', str(worker_concurrency))
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent' or importlib.util.find_spec('psycopg2') is None:
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        server.log.warning('psycogreen is not installed; database calls will block gevent workers')
@@ -0,0 +1,96 @@
+import datetime
+import decimal
+import os
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(value):
+    """Encode the types our models hand out that JSON lacks"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with a stdlib fallback.
+
+    Decimal, datetime and UUID are encoded natively (numbers and ISO 8601
+    strings) rather than through Flask's HTTP-date handling. Keys are not
+    sorted. JSON_BACKEND=stdlib forces the json module, which is also used
+    when orjson is not installed.
+    """
+
+    default = staticmethod(json_default)
+    sort_keys = False
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        backend = backend or os.getenv('JSON_BACKEND', 'orjson')
+        if backend not in ('orjson', 'stdlib'):
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        self.backend = backend if orjson is not None else 'stdlib'
+
+    def _orjson_options(self, indent):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing json.dumps-only arguments get the stdlib encoder
+        if self.backend == 'stdlib' or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=self._orjson_options(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'stdlib' or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.backend == 'stdlib':
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # orjson produces bytes, which the response takes without a decode/encode round trip
+        body = orjson.dumps(
+            obj,
+            default=json_default,
+            option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def compile_serializer(fields, name='serialize'):
+    """Build obj -> dict for a fixed set of fields, as a single function.
+
+    fields maps each output key to an attribute name, or to a
+    (attribute name, converter) pair whose converter is applied to the
+    value. The generated function reads every attribute inline, so a row
+    costs one call rather than one lambda call per field.
+    """
+    namespace = {}
+    entries = []
+    for index, (key, spec) in enumerate(fields.items()):
+        attribute, converter = (spec, None) if isinstance(spec, str) else spec
+        if not attribute.isidentifier():
+            raise ValueError(f"Not an attribute name: {attribute!r}")
+        expression = f"obj.{attribute}"
+        if converter is not None:
+            namespace[f"_convert_{index}"] = converter
+            expression = f"_convert_{index}({expression})"
+        entries.append(f"{key!r}: {expression}")
+    source = f"def {name}(obj):\n    return {{{', '.join(entries)}}}\n"
+    exec(compile(source, f"<serializer {name}>", 'exec'), namespace)
+    return namespace[name]
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY = 'auth:revoked'
+REVOKED_USERS_KEY = 'auth:revoked-users'
+VERSION_KEY = 'auth:revoked:version'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """Token revocation list stored in Redis and checked through a local Bloom filter.
+
+    Revoked token ids (and users whose tokens were all revoked) live in a
+    Redis sorted set scored by when the entry stops mattering. Every process
+    keeps a Bloom filter of those entries, rebuilt by a background thread
+    whenever the list version changes. Most checks are a memory lookup; only
+    Bloom hits are confirmed against Redis.
+    """
+
+    def __init__(self, redis_client, sync_interval=2, capacity=100000, error_rate=0.001):
+        self.redis = redis_client
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._syncer_pid = None
+
+    def revoke_token(self, jti, expires_at):
+        """Revoke one token until its own expiry (epoch seconds)"""
+        pipe = self.redis.pipeline()
+        pipe.zadd(REVOKED_KEY, {f"jti:{jti}": expires_at})
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+        self._add_local(f"jti:{jti}")
+
+    def revoke_user(self, user_id, token_lifetime):
+        """Revoke every token issued to a user up to now"""
+        now = int(time.time())
+        pipe = self.redis.pipeline()
+        pipe.hset(REVOKED_USERS_KEY, str(user_id), now)
+        pipe.zadd(REVOKED_KEY, {f"user:{user_id}": now + int(token_lifetime)})
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+        self._add_local(f"user:{user_id}")
+
+    def is_revoked(self, payload):
+        self._ensure_syncer()
+        bloom = self._bloom
+        if bloom is None:
+            return False
+
+        jti_key = f"jti:{payload.get('jti')}"
+        user_key = f"user:{payload.get('sub')}"
+        try:
+            if jti_key in bloom and self.redis.zscore(REVOKED_KEY, jti_key) is not None:
+                return True
+            if user_key in bloom:
+                revoked_at = self.redis.hget(REVOKED_USERS_KEY, str(payload.get('sub')))
+                if revoked_at is not None and payload.get('iat', 0) <= int(revoked_at):
+                    return True
+        except Exception as e:
+            # Fail open on Redis errors; short access token lifetimes bound the exposure
+            logger.warning(f"Revocation check failed: {e}")
+        return False
+
+    def sync(self):
+        """Rebuild the local Bloom filter if the Redis list changed"""
+        version = self.redis.get(VERSION_KEY)
+        if version == self._version and self._bloom is not None:
+            return
+
+        now = time.time()
+        self.redis.zremrangebyscore(REVOKED_KEY, '-inf', now)
+        entries = self.redis.zrangebyscore(REVOKED_KEY, now, '+inf')
+
+        bloom = BloomFilter(max(self.capacity, len(entries) * 2), self.error_rate)
+        for entry in entries:
+            bloom.add(entry.decode() if isinstance(entry, bytes) else entry)
+
+        with self._lock:
+            self._bloom = bloom
+            self._version = version
+
+    def _add_local(self, entry):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(entry)
+
+    def _ensure_syncer(self):
+        # One sync thread per process, started lazily so it survives forking servers
+        if self._syncer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._syncer_pid == os.getpid():
+                return
+            self._syncer_pid = os.getpid()
+        try:
+            self.sync()
+        except Exception as e:
+            logger.warning(f"Initial revocation list sync failed: {e}")
+        threading.Thread(target=self._sync_forever, name='revocation-sync', daemon=True).start()
+
+    def _sync_forever(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"Revocation list sync failed: {e}")
@@ -0,0 +1,70 @@
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Any fixed key works; it only has to be the same for every runner of one database
+MIGRATION_LOCK_ID = 727_001
+
+
+def schema_version(connection):
+    """Highest applied migration version, or 0 for an unmigrated database"""
+    exists = connection.execute(text("SELECT to_regclass('schema_migrations') IS NOT NULL")).scalar()
+    if not exists:
+        return 0
+    return connection.execute(text('SELECT COALESCE(max(version), 0) FROM schema_migrations')).scalar()
+
+
+class MigrationRunner:
+    """Applies numbered schema migrations once each, in order.
+
+    migrations is a list of (version, description, step) where step is a
+    list of SQL statements or a callable taking the connection. Everything
+    pending runs in one transaction under an advisory lock, so concurrent
+    runners (say, several deploy jobs) apply each migration exactly once
+    and a failure leaves the schema untouched.
+    """
+
+    def __init__(self, engine, migrations):
+        versions = [version for version, _, _ in migrations]
+        if versions != sorted(set(versions)):
+            raise ValueError('Migration versions must be unique and ascending')
+        self.engine = engine
+        self.migrations = migrations
+
+    @property
+    def latest(self):
+        return self.migrations[-1][0] if self.migrations else 0
+
+    def current(self):
+        with self.engine.connect() as connection:
+            return schema_version(connection)
+
+    def run(self):
+        """Apply pending migrations; returns the versions applied"""
+        applied = []
+        with self.engine.begin() as connection:
+            connection.execute(text('SELECT pg_advisory_xact_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+            connection.execute(text(
+                'CREATE TABLE IF NOT EXISTS schema_migrations ('
+                'version integer PRIMARY KEY, '
+                'description text NOT NULL, '
+                'applied_at timestamp NOT NULL DEFAULT localtimestamp)'
+            ))
+            current = schema_version(connection)
+            for version, description, step in self.migrations:
+                if version <= current:
+                    continue
+                logger.info(f"Applying migration {version}: {description}")
+                if callable(step):
+                    step(connection)
+                else:
+                    for statement in step:
+                        connection.execute(text(statement))
+                connection.execute(
+                    text('INSERT INTO schema_migrations (version, description) VALUES (:version, :description)'),
+                    {'version': version, 'description': description}
+                )
+                applied.append(version)
+        return applied
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import flask
+import flask_sqlalchemy
+import sqlalchemy
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('sql')
+
+# Frames from these packages are skipped when looking for a query's call site
+LIBRARY_PREFIXES = tuple(
+    os.path.dirname(module.__file__) + os.sep
+    for module in (sqlalchemy, flask, flask_sqlalchemy)
+) + (os.path.abspath(__file__),)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PARAM = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """SQL with literals and parameters replaced by ?, lists collapsed, one line"""
+    statement = _STRING.sub('?', statement)
+    statement = _PARAM.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _LIST.sub('(?...)', statement)
+    return _SPACE.sub(' ', statement).strip()
+
+
+def call_site():
+    """file:line (function) of the innermost application frame"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(LIBRARY_PREFIXES) and not filename.startswith('<'):
+            return f"{os.path.basename(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return None
+
+
+class QueryStats:
+    """Opt-in per-request SQL instrumentation.
+
+    Counts statements, database time and rows for every request on all
+    engines (shards and replicas included). The totals are added to the
+    response as X-DB-* and Server-Timing headers and aggregated per route
+    for the metrics endpoint. Statements slower than slow_ms are logged
+    with their normalized SQL and call site, and so are statements one
+    request repeats repeat_threshold times or more, which is what a lazy
+    load inside a loop (N+1) looks like.
+    """
+
+    def __init__(self, app=None, service=None, enabled=False, slow_ms=100, repeat_threshold=10):
+        self.service = service
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self._lock = threading.Lock()
+        self._routes = defaultdict(lambda: {
+            'requests': 0, 'statements': 0, 'db_ms': 0.0, 'rows': 0, 'max_statements': 0
+        })
+        self._slow = 0
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.service = self.service or app.import_name
+        if not self.enabled:
+            return
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        # Listening on the Engine class covers engines created later, like replicas
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_execute)
+            self._listening = True
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g._sql_stats = {'statements': 0, 'db_ms': 0.0, 'rows': 0, 'seen': Counter()}
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['_sql_started'] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('_sql_started', None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        rows = max(cursor.rowcount, 0)
+
+        current = g.get('_sql_stats') if has_request_context() else None
+        repeats = 0
+        if current is not None:
+            current['statements'] += 1
+            current['db_ms'] += duration_ms
+            current['rows'] += rows
+            current['seen'][statement] += 1
+            repeats = current['seen'][statement]
+
+        if duration_ms >= self.slow_ms:
+            with self._lock:
+                self._slow += 1
+            self._log('slow_query', statement, duration_ms=round(duration_ms, 2), rows=rows)
+        elif repeats == self.repeat_threshold:
+            # Once per statement and request, at the point it crosses the threshold
+            self._log('repeated_query', statement, repeats=repeats)
+
+    def _log(self, kind, statement, **fields):
+        logger.warning(json.dumps(dict({
+            'ts': round(time.time(), 3),
+            'service': self.service,
+            'event': kind,
+            'sql': normalize_sql(statement),
+            'call_site': call_site(),
+            'route': request.url_rule.rule if has_request_context() and request.url_rule else None
+        }, **fields)))
+
+    def _finish(self, response):
+        current = g.pop('_sql_stats', None)
+        if current is None:
+            return response
+        db_ms = round(current['db_ms'], 2)
+        response.headers['X-DB-Queries'] = str(current['statements'])
+        response.headers['X-DB-Time-Ms'] = str(db_ms)
+        response.headers['X-DB-Rows'] = str(current['rows'])
+        response.headers.add('Server-Timing', f"db;dur={db_ms};desc=\"{current['statements']} queries\"")
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        with self._lock:
+            totals = self._routes[f"{request.method} {route}"]
+            totals['requests'] += 1
+            totals['statements'] += current['statements']
+            totals['db_ms'] += current['db_ms']
+            totals['rows'] += current['rows']
+            totals['max_statements'] = max(totals['max_statements'], current['statements'])
+        return response
+
+    def stats(self):
+        if not self.enabled:
+            return {'enabled': False}
+        with self._lock:
+            routes = {route: dict(totals) for route, totals in self._routes.items()}
+            slow = self._slow
+        for totals in routes.values():
+            requests = totals['requests']
+            totals['avg_statements'] = round(totals['statements'] / requests, 2)
+            totals['avg_db_ms'] = round(totals['db_ms'] / requests, 2)
+            totals['db_ms'] = round(totals['db_ms'], 2)
+        return {'enabled': True, 'slow_queries': slow, 'routes': routes}